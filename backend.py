@@ -5,90 +5,282 @@ import cv2
 import numpy as np
 import base64
 import json
-from ultralytics import YOLO
 from datetime import datetime
 import time
 import sys
 import os
 from pathlib import Path
 import torch
+import functools
+import math
+from http import HTTPStatus
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from inference_scheduler import InferenceScheduler
+from capture import CaptureWorker
+from protocol import pack_frame
+from client_session import ClientSession, normalize_profile, encode_variant
+from camera_config import load_camera_config, camera_settings, configured_camera_ids
+from motion import MotionDetector
+from rate_controller import InferenceRateController
+from tracker import BoxTracker
+from zones import ZoneFilter
+from tiling import TiledDetector
+from cascade import WeaponCascade
+from recorder import ClipRecorder
+from encoders import AdaptiveQuality
+from event_store import EventStore, summarize
+from metrics import MetricsRegistry
+from profiler import SamplingProfiler
+from runtimes import RUNTIMES, load_model, ensure_export, list_runtime_variants
+from model_cache import ModelCache, estimate_model_bytes, warm_up
+from pipeline_workers import (parse_detections, render_frame, infer_frames, detect_weapons, infer_weapon_crops,
+                              predict_options, predict_kwargs, start_worker_preload)
 
 logging.basicConfig(level=logging.INFO)
 
 # Global state
-CONNECTED_CLIENTS = set()
+CONNECTED_CLIENTS = {}  # {websocket: ClientSession}
+CLIENT_QUEUE_SIZE = 8  # video frames queued per client before the oldest are dropped
 ACTIVE_CAMERAS = {}  # {camera_id: task}
+CAPTURE_WORKERS = {}  # {camera_id: CaptureWorker}
 device = "cuda" if torch.cuda.is_available() else "cpu"
-model = YOLO("yolo_models/yolov8n.pt").to(device)
-print(f"Using device: {device}")
+# "pytorch", "onnx" or "openvino" (see runtimes.py); ONNX/OpenVINO run on CPU
+current_runtime = os.environ.get("INFERENCE_RUNTIME", "pytorch")
+model = load_model("yolo_models/yolov8n.pt", current_runtime, device)
+print(f"Using device: {device}, runtime: {current_runtime}")
 current_model_path = "yolo_models/yolov8n.pt"
 
+# Recently used models stay loaded and warmed so switching back is instant
+MODEL_CACHE = ModelCache(
+    max_models=int(os.environ.get("MODEL_CACHE_MAX_MODELS", "4")),
+    max_bytes=int(os.environ.get("MODEL_CACHE_MAX_MB", "1024")) * 1024 * 1024
+)
+MODEL_CACHE.put(
+    (str((Path(__file__).parent / current_model_path).resolve()), current_runtime),
+    model, estimate_model_bytes(model, current_model_path)
+)
+MODEL_SWAP_LOCK = asyncio.Lock()  # one background model load at a time
+CASCADE_MODEL_LOCK = asyncio.Lock()  # first camera to need the cascade's weapon model loads it
+BACKGROUND_TASKS = set()  # keeps fire-and-forget tasks referenced until they finish
+
 if(len(sys.argv) > 1):
     num_of_cameras = int(sys.argv[1])
 else:
     num_of_cameras = 1
 
-print(f"Number of cameras set to: {num_of_cameras}")
 # Detection memory per camera
 DETECTION_STATE = {}
 
 THREAT_DECAY_SECONDS = 5  # how long to keep high threat after last detection
 
-def encode_frame(frame):
-    """Encode frame to base64 for transmission"""
-    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-    return base64.b64encode(buffer).decode('utf-8')
+# Per-camera settings (cameras.yml), see camera_config.py
+CAMERA_CONFIG = load_camera_config()
+# Cameras with a 'source' in cameras.yml replace the command line count of local devices
+CAMERA_IDS = configured_camera_ids(CAMERA_CONFIG, num_of_cameras)
+num_of_cameras = len(CAMERA_IDS)
+print(f"Number of cameras set to: {num_of_cameras} {CAMERA_IDS}")
+
+# Detection history: one row per inferred frame, partitioned Parquet under events/
+EVENT_STORE = EventStore(os.environ.get("EVENT_STORE_DIR", "events"))
+
+# Cross-camera batching: frames from all active cameras go through the model together
+INFERENCE_MAX_BATCH = 8      # most frames per model call
+INFERENCE_MAX_WAIT = 0.02    # seconds to wait for other cameras before flushing a partial batch
+INFERENCE_SCHEDULER = None   # created in main() once the event loop is running
+
+# Where detect/draw/encode run so the event loop only awaits results.
+# "thread": one inference thread runs the global model (ultralytics models are not thread-safe).
+# "process": each inference worker process loads its own copy of the model, warmed by
+#            a background load in each worker before a switch_model takes effect.
+EXECUTION_MODE = os.environ.get("EXECUTION_MODE", "thread")
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "1"))
+if EXECUTION_MODE != "process" and INFERENCE_WORKERS != 1:
+    # Threads share the one global model, and ultralytics models aren't thread-safe
+    logging.warning("INFERENCE_WORKERS only applies to EXECUTION_MODE=process, using 1 inference thread")
+    INFERENCE_WORKERS = 1
+STAGE_WORKERS = int(os.environ.get("STAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+INFERENCE_EXECUTOR = None
+STAGE_EXECUTOR = None
+PRELOAD_TIMEOUT = 300       # seconds for every inference worker to warm a new model
+PRELOAD_POLL_SECONDS = 0.5
+
+# Pipeline metrics: Prometheus text at http://localhost:8765/metrics and the 'metrics' command
+METRICS = MetricsRegistry()
+STAGE_SECONDS = METRICS.histogram(
+    'pipeline_stage_seconds', 'Time spent in each pipeline stage per frame', ('camera', 'stage'))
+FRAMES_PROCESSED = METRICS.counter(
+    'frames_processed_total', 'Frames taken from capture and published', ('camera',))
+FRAMES_INFERRED = METRICS.counter(
+    'frames_inferred_total', 'Frames that went through the model', ('camera',))
+CLIENT_FRAMES_DROPPED = METRICS.counter(
+    'client_frames_dropped_total', 'Frames dropped because a client fell behind')
+CLIENT_SEND_LAG = METRICS.histogram(
+    'client_send_lag_seconds', 'Time from queueing a message to finishing its send')
+METRICS.callback_counter(
+    'capture_frames_dropped_total', 'Frames overwritten in the capture buffer before processing',
+    ('camera',), lambda: {(cid,): w.buffer.frames_dropped for cid, w in CAPTURE_WORKERS.items()})
+METRICS.gauge(
+    'client_queue_depth', 'Messages waiting in each client queue', ('client',),
+    collect=lambda: {(s.client_id,): s.stats()['queue_depth'] for s in CONNECTED_CLIENTS.values()})
+METRICS.gauge(
+    'client_lag_seconds', 'Queue-to-send lag of the last message per client', ('client',),
+    collect=lambda: {(s.client_id,): s.last_lag_ms / 1000 for s in CONNECTED_CLIENTS.values()})
+METRICS.gauge(
+    'inference_pending_frames', 'Frames waiting for the next inference batch',
+    collect=lambda: {(): INFERENCE_SCHEDULER.stats()['pending']} if INFERENCE_SCHEDULER else {})
+METRICS.gauge(
+    'event_store_queued_rows', 'Detection rows waiting to be written',
+    collect=lambda: {(): EVENT_STORE.stats()['queued']})
+METRICS.gauge('active_cameras', 'Running camera loops', collect=lambda: {(): len(ACTIVE_CAMERAS)})
+METRICS.gauge('connected_clients', 'Connected WebSocket clients', collect=lambda: {(): len(CONNECTED_CLIENTS)})
+
+# On-demand profiling sessions ('profile' command); stages report spans while one runs
+PROFILER = SamplingProfiler(os.environ.get("PROFILE_DIR", "profiles"))
+PROFILE_MAX_SECONDS = 120
+
+
+def observe_stage(camera_id, stage, start):
+    """Record a stage that began at perf_counter() `start` in the metrics and any running profile"""
+    duration = time.perf_counter() - start
+    STAGE_SECONDS.observe(duration, camera_id, stage)
+    PROFILER.add_span(stage, camera_id, start, duration)
+
+
+def create_executor(mode, workers):
+    """Create a thread or process pool for pipeline stages"""
+    if mode == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    if mode != "thread":
+        logging.warning(f"Unknown EXECUTION_MODE '{mode}', falling back to threads")
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline")
+
+
+def infer_frames_local(frames, options=None):
+    """Run the current global model on a batch and parse each result"""
+    current_model = model
+    kwargs = predict_kwargs(current_model, options)
+    return [parse_detections(r) for r in current_model(frames, verbose=False, **kwargs)]
+
+
+async def run_batch_inference(frames, options=None):
+    """Run a batch in the inference executor, one detections dict per frame.
+    options (from predict_options) carry a camera's class filter and thresholds into the model call."""
+    loop = asyncio.get_running_loop()
+    if EXECUTION_MODE == "process":
+        job = functools.partial(infer_frames, worker_model_file(current_model_path), current_runtime,
+                                device, frames, options)
+    else:
+        job = functools.partial(infer_frames_local, frames, options)
+    start = time.perf_counter()
+    results = await loop.run_in_executor(INFERENCE_EXECUTOR, job)
+    observe_stage('all', 'model_batch', start)
+    return results
+
+
+def worker_model_file(model_path):
+    """The path inference workers key their model copies by"""
+    return str(Path(__file__).parent / model_path)
+
+
+async def preload_inference_workers(model_path, runtime):
+    """Process mode: warm a model in the inference workers without taking them off batches.
+
+    Exports (minutes for ONNX/OpenVINO on first use) run here in the parent.
+    Each worker then loads on a background thread of its own while it keeps
+    serving batches on the old model, and short status jobs poll until every
+    worker seen reports it ready. A worker the polls never reached (pools that
+    spawn lazily) loads on its first batch.
+    """
+    loop = asyncio.get_running_loop()
+    model_file = worker_model_file(model_path)
+    await loop.run_in_executor(None, ensure_export, model_file, runtime)
+
+    start = time.perf_counter()
+    deadline = time.monotonic() + PRELOAD_TIMEOUT
+    seen, ready = set(), set()
+    quiet_rounds = 0
+    while True:
+        results = await asyncio.gather(*(
+            loop.run_in_executor(INFERENCE_EXECUTOR, start_worker_preload, model_file, runtime, device)
+            for _ in range(INFERENCE_WORKERS)
+        ))
+        pids = {pid for pid, _ in results}
+        quiet_rounds = 0 if pids - seen else quiet_rounds + 1
+        seen |= pids
+        ready |= {pid for pid, is_ready in results if is_ready}
+        if ready == seen and (len(seen) >= INFERENCE_WORKERS or quiet_rounds >= 3):
+            break
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{len(ready)}/{len(seen)} inference workers ready after {PRELOAD_TIMEOUT}s")
+        await asyncio.sleep(PRELOAD_POLL_SECONDS)
+    logging.info(f"✅ {model_path} ({runtime}) warm in {len(ready)} inference workers "
+                 f"in {time.perf_counter() - start:.1f}s")
+
+
+async def switch_worker_model(model_path, runtime=None):
+    """switch_model for process mode.
+
+    The parent's own model isn't used for inference here, so instead of
+    loading it in the parent every inference worker loads and warms it in the
+    background; only then do new batches point at it. Cameras keep running on
+    the old model throughout.
+    """
+    global current_model_path, current_runtime
+    runtime = runtime or current_runtime
+    if not (Path(__file__).parent / model_path).exists():
+        logging.error(f"Model file not found: {model_path}")
+        return False
+    try:
+        await preload_inference_workers(model_path, runtime)
+    except Exception as e:
+        logging.error(f"❌ Failed to load model {model_path} in inference workers: {e}")
+        return False
+    current_model_path = model_path
+    current_runtime = runtime
+    logging.info(f"✅ Successfully switched to model: {model_path} ({runtime})")
+    return True
+
+
+def cascade_model_path(weights):
+    return (Path(__file__).parent / weights).resolve()
+
+
+def load_cascade_model(full_path, runtime):
+    """Load and warm the cascade's weapon model, or take it from MODEL_CACHE. Blocking."""
+    cache_key = (str(full_path), runtime)
+    weapon_model = MODEL_CACHE.get(cache_key)
+    if weapon_model is None:
+        weapon_model = load_model(full_path, runtime, device)
+        warm_up(weapon_model)
+        MODEL_CACHE.put(cache_key, weapon_model, estimate_model_bytes(weapon_model, full_path))
+        logging.info(f"✅ Cascade weapon model loaded: {full_path} ({runtime})")
+    return weapon_model
+
+
+async def run_weapon_inference(weights, crops, imgsz, conf, weapon_names):
+    """Run the cascade's weapon model on one batch of padded person crops"""
+    loop = asyncio.get_running_loop()
+    full_path = cascade_model_path(weights)
+    if EXECUTION_MODE == "process":
+        job = functools.partial(infer_weapon_crops, str(full_path), current_runtime, device,
+                                crops, imgsz, conf, weapon_names)
+    else:
+        async with CASCADE_MODEL_LOCK:
+            weapon_model = await loop.run_in_executor(None, load_cascade_model, full_path, current_runtime)
+        job = functools.partial(detect_weapons, weapon_model, crops, imgsz, conf, weapon_names)
+    start = time.perf_counter()
+    results = await loop.run_in_executor(INFERENCE_EXECUTOR, job)
+    observe_stage('all', 'cascade_batch', start)
+    return results
 
 
-def detect_objects(frame, camera_id):
-    """Run YOLO detection on frame"""
+def apply_threat_logic(detections, camera_id):
+    """Update per-camera alert state and fill in alert/threat_level"""
     state = DETECTION_STATE.setdefault(camera_id, {
         'last_weapon_time': None,
         'weapon_alert_active': False
     })
-    results = model(frame, verbose=False)
-
-    detections = {
-        'people': [],
-        'weapons': [],
-        'objects': [],
-        'people_count': 0,
-        'threat_level': 0,
-        'alert': None
-    }
-
-    weapon_classes = {43: 'Knife', 34: 'Baseball Bat', 76: 'Scissors'}
-    weapon_found = False
-
-    for result in results:
-        for box in result.boxes:
-            cls = int(box.cls[0])
-            conf = float(box.conf[0])
-            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().tolist()
-            label = model.names[cls]
-
-            if cls == 0:
-                detections['people'].append({
-                    'bbox': [x1, y1, x2, y2],
-                    'confidence': conf
-                })
-                detections['people_count'] += 1
-
-            elif cls in weapon_classes:
-                weapon_found = True
-                detections['weapons'].append({
-                    'name': weapon_classes[cls],
-                    'confidence': conf,
-                    'bbox': [x1, y1, x2, y2]
-                })
-
-            else:
-                detections['objects'].append({
-                    'name': label,
-                    'confidence': conf,
-                    'bbox': [x1, y1, x2, y2]
-                })
-
+    weapon_found = len(detections['weapons']) > 0
     now = time.time()
 
     # Alert logic per camera
@@ -117,57 +309,158 @@ def detect_objects(frame, camera_id):
     return detections
 
 
-def draw_detections(frame, detections, camera_id=None):
-    """Draw bounding boxes on frame"""
-    for person in detections['people']:
-        x1, y1, x2, y2 = map(int, person['bbox'])
-        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-        label = f"Person {person['confidence']:.2f}"
-        cv2.putText(frame, label, (x1, y1 - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-
-    for weapon in detections['weapons']:
-        x1, y1, x2, y2 = map(int, weapon['bbox'])
-        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 3)
-        label = f"{weapon['name']} {weapon['confidence']:.2f}"
-        cv2.putText(frame, label, (x1, y1 - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-        
-    # Annotate camera ID on bottom-right
-    if camera_id is not None:
-        h, w = frame.shape[:2]
-        text = f"Camera {camera_id}"
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        scale = 1
-        thickness = 2
-        color = (255, 255, 255)  # white
-        text_size = cv2.getTextSize(text, font, scale, thickness)[0]
-        position = (w - text_size[0] - 10, h - 10)
-        cv2.putText(frame, text, position, font, scale, color, thickness)
-    return frame
+def frame_message(camera_id, item, payload, jpeg_bytes, binary):
+    """Serialize one frame for either the binary protocol or the JSON/base64 one"""
+    if binary:
+        return pack_frame(camera_id, item.seq, item.timestamp, payload, jpeg_bytes or b'')
+    if jpeg_bytes is None:
+        # Detections-only subscribers get no pixels
+        return json.dumps({'type': 'detections', 'camera_id': camera_id, **payload})
+    return json.dumps({
+        'type': 'frame',
+        'camera_id': camera_id,
+        'frame': base64.b64encode(jpeg_bytes).decode('utf-8'),
+        **payload
+    })
+
+
+async def publish_frame(loop, camera_id, item, frame, detections, capture_info, recorder=None, quality=None):
+    """Encode each distinct stream profile once and queue it for every client that uses it.
+    The clip recorder, if any, is just one more encode variant fed from the same render.
+    With a per-camera byte budget, quality (AdaptiveQuality) picks each client variant's JPEG quality."""
+    now = time.time()
+    is_alert = detections['alert'] is not None
+    # Alerts skip the per-client max_fps so they always get through
+    recipients = [
+        session for session in list(CONNECTED_CLIENTS.values())
+        if session.wants_camera(camera_id) and (is_alert or session.frame_due(camera_id, now))
+    ]
+
+    variants = {encode_variant(session.profile) for session in recipients}
+    alert_active = DETECTION_STATE.get(camera_id, {}).get('weapon_alert_active', False)
+    # The recorder is paced to its own fps, so most frames cost no extra encode
+    record = recorder is not None and recorder.wants_frame(item.timestamp, alert_active)
+    if record:
+        variants.add(recorder.variant)
+    variants.discard(None)
+    encoded = {}
+    if variants:
+        # The recorder keeps its configured quality; only streamed variants adapt to the budget
+        streamed = [v for v in variants if not record or v != recorder.variant]
+        qualities = quality.plan(streamed) if quality is not None else None
+        start = time.perf_counter()
+        encoded = await loop.run_in_executor(
+            STAGE_EXECUTOR, render_frame, frame, detections, camera_id, tuple(variants), qualities
+        )
+        observe_stage(camera_id, 'render', start)
+        if quality is not None:
+            quality.observe({v: encoded[v] for v in streamed})
+
+    if record:
+        recorder.add(item.timestamp, encoded[recorder.variant], alert_active)
+    if not recipients:
+        return
+
+    h, w = frame.shape[:2]
+    payload = {
+        'detections': detections,
+        'timestamp': datetime.now().isoformat(),
+        'capture': capture_info,
+        'frame_size': [w, h]
+    }
+
+    # Each (profile, protocol) message is built at most once per frame and shared.
+    # Frames that carry an alert are queued as priority so they are never dropped.
+    start = time.perf_counter()
+    messages = {}
+    dropped = 0
+    for session in recipients:
+        variant = encode_variant(session.profile)
+        binary = bool(session.options.get('binary_frames'))
+        key = (variant, binary)
+        if key not in messages:
+            messages[key] = frame_message(camera_id, item, payload, encoded.get(variant), binary)
+        before = session.frames_dropped
+        session.enqueue(messages[key], priority=is_alert)
+        dropped += session.frames_dropped - before
+    observe_stage(camera_id, 'serialize', start)
+    if dropped:
+        CLIENT_FRAMES_DROPPED.inc(amount=dropped)
+
+
+def release_camera(camera_id, reason=None, source=None):
+    """Take a camera loop that ended on its own out of ACTIVE_CAMERAS and tell clients why"""
+    if ACTIVE_CAMERAS.get(camera_id) is asyncio.current_task():
+        del ACTIVE_CAMERAS[camera_id]
+    if reason is not None:
+        broadcast({
+            'type': 'camera_stopped',
+            'camera_id': camera_id,
+            'reason': reason,
+            'source': source
+        })
 
 
 async def camera_loop(camera_id):
-    """Continuously capture and process frames for one camera"""
-    cap = cv2.VideoCapture(camera_id)
-    if not cap.isOpened():
-        logging.error(f"Could not open camera {camera_id}")
+    """Continuously process the freshest frame from one camera's capture thread"""
+    loop = asyncio.get_running_loop()
+    settings = camera_settings(CAMERA_CONFIG, camera_id)
+
+    # Build every per-camera stage before touching the device, so a config
+    # mistake (unknown tiling mode, malformed zone, bad source) fails cleanly
+    try:
+        worker = CaptureWorker(camera_id, settings['source'])
+        motion_cfg = settings['motion']
+        motion = MotionDetector(**motion_cfg) if motion_cfg['enabled'] else None
+        rate = InferenceRateController(**settings['stride'])
+        tracker = BoxTracker(**settings['tracker']) if settings['tracker']['enabled'] else None
+        recorder = ClipRecorder(camera_id, **settings['recording']) if settings['recording']['enabled'] else None
+        quality = AdaptiveQuality(**settings['encoding'])
+        zones = ZoneFilter(**settings['zones']) if settings['zones']['areas'] else None
+        # Class allow-list and thresholds go into the model call itself (see predict_kwargs)
+        options = predict_options(settings['detection'])
+        send_objects = settings['detection']['send_objects']
+        tiler = TiledDetector(**settings['tiling']) if settings['tiling']['enabled'] else None
+        cascade = None
+        if settings['cascade']['enabled']:
+            if cascade_model_path(settings['cascade']['weapon_model']).exists():
+                cascade = WeaponCascade(**settings['cascade'])
+            else:
+                logging.error(f"Camera {camera_id} cascade disabled, weapon model not found: "
+                              f"{settings['cascade']['weapon_model']}")
+    except Exception as e:
+        logging.error(f"Camera {camera_id} not started, invalid settings in cameras.yml: {e}")
+        release_camera(camera_id, 'config_error')
         return
 
-    # Re-read values to verify
-    actual_brightness = cap.get(cv2.CAP_PROP_BRIGHTNESS)
-    actual_fps = cap.get(cv2.CAP_PROP_FPS)
-    print(f"Brightness set to {actual_brightness}, FPS set to {actual_fps}")
+    if not await loop.run_in_executor(None, worker.open):
+        logging.error(f"Could not open camera {camera_id}: {worker.source.describe()}")
+        worker.stop()
+        release_camera(camera_id, 'open_failed', worker.source.describe())
+        return
+
+    worker.start(loop)
+    CAPTURE_WORKERS[camera_id] = worker
+    logging.info(f"Camera {camera_id} started successfully: {worker.source.describe()}")
 
-    logging.info(f"Camera {camera_id} started successfully")
+    last_detections = None
+    last_inference_time = 0.0
 
     try:
         while camera_id in ACTIVE_CAMERAS:
-            ret, frame = cap.read()
-            if not ret:
-                logging.warning(f"Camera {camera_id} failed to read frame")
-                await asyncio.sleep(0.1)
+            # Paced by the capture thread: wait for a frame newer than the last one
+            item = await worker.buffer.next(timeout=1.0)
+            if item is None:
+                if not worker.running:
+                    # A non-looping file or image directory ran out, or the capture thread died
+                    reason = 'finished' if worker.source.finished else 'capture_failed'
+                    logging.info(f"Camera {camera_id} capture ended ({reason})")
+                    release_camera(camera_id, reason, worker.source.describe())
+                    break
                 continue
+            frame = item.frame
+            taken_at = time.time()
+            STAGE_SECONDS.observe(max(0.0, taken_at - item.timestamp), camera_id, 'capture')
             
             # if camera_id == 0: # hardcoded enhancements for camera 0
             #      # --- Convert to float for precision ---
@@ -202,31 +495,97 @@ async def camera_loop(camera_id):
             #     blurred = cv2.GaussianBlur(frame, (0, 0), 3)
             #     frame = cv2.addWeighted(frame, 1 + sharpness, blurred, -sharpness, 0)
             
-            detections = detect_objects(frame, camera_id)
-            frame_with_detections = draw_detections(frame.copy(), detections, camera_id)
-            encoded_frame = encode_frame(frame_with_detections)
-
-            message = json.dumps({
-                'type': 'frame',
-                'camera_id': camera_id,
-                'frame': encoded_frame,
-                'detections': detections,
-                'timestamp': datetime.now().isoformat()
-            })
-
-            disconnected = set()
-            for client in CONNECTED_CLIENTS:
-                try:
-                    await client.send(message)
-                except websockets.exceptions.ConnectionClosed:
-                    disconnected.add(client)
-            for d in disconnected:
-                CONNECTED_CLIENTS.discard(d)
-
-            await asyncio.sleep(1/30)  # ~30 FPS
+            # Motion gate: on a static scene reuse the last detections instead of running YOLO,
+            # but still run a full inference at least every max_skip_seconds
+            moving = True
+            if motion is not None:
+                start = time.perf_counter()
+                moving = await loop.run_in_executor(None, motion.update, frame)
+                observe_stage(camera_id, 'motion', start)
+            now = time.time()
+            stale = now - last_inference_time >= motion_cfg['max_skip_seconds']
+
+            # Adaptive stride: alerts get the full rate, quiet cameras drop to idle_fps
+            state = DETECTION_STATE.get(camera_id, {})
+            alert_active = state.get('weapon_alert_active', False)
+            threat_level = last_detections['threat_level'] if last_detections else 0
+            inference_fps = rate.update(alert_active, threat_level, moving)
+
+            if last_detections is None or stale or (rate.due(now) and (moving or alert_active)):
+                # With zones, only their bounding crop goes through the model
+                infer_input, offset = zones.crop(frame) if zones is not None else (frame, None)
+                start = time.perf_counter()
+                if tiler is not None:
+                    # Full frame through the shared scheduler, tiles as one extra batch, merged with NMS
+                    detections = await tiler.detect(
+                        infer_input,
+                        functools.partial(INFERENCE_SCHEDULER.submit, camera_id, options=options),
+                        functools.partial(run_batch_inference, options=options)
+                    )
+                else:
+                    detections = await INFERENCE_SCHEDULER.submit(camera_id, infer_input, options)
+                observe_stage(camera_id, 'inference', start)
+                if detections is None:
+                    # Superseded by a newer frame from this camera before it was batched
+                    continue
+                if not send_objects:
+                    # Dropped here, not in the model call, so this camera still batches with the rest
+                    detections['objects'] = []
+                if cascade is not None:
+                    # Person gate passed: weapons come from the heavy model on person crops
+                    start = time.perf_counter()
+                    detections = await cascade.detect(
+                        infer_input, detections,
+                        functools.partial(run_weapon_inference, cascade.weapon_model)
+                    )
+                    observe_stage(camera_id, 'cascade', start)
+                if zones is not None:
+                    detections = zones.restore(detections, offset)
+                FRAMES_INFERRED.inc(camera_id)
+                if tracker is not None:
+                    start = time.perf_counter()
+                    detections = tracker.update(detections, item.timestamp)
+                    observe_stage(camera_id, 'tracker', start)
+                last_detections = detections
+                last_inference_time = time.time()
+                rate.mark(last_inference_time)
+                inferred = True
+            else:
+                detections = dict(last_detections)
+                if tracker is not None:
+                    # Carry boxes forward so they don't freeze or flicker between inferences
+                    detections = tracker.predict(detections, item.timestamp)
+                inferred = False
+            detections['alert'] = None
+            detections = apply_threat_logic(detections, camera_id)
+            detections['inferred'] = inferred
+            detections['inference_fps'] = round(inference_fps, 1)
+            if motion is not None:
+                detections['motion_score'] = round(motion.last_score, 4)
+            if tiler is not None:
+                detections['tiles'] = tiler.last_tiles
+            capture_info = {
+                'seq': item.seq,
+                'frames_dropped': worker.buffer.frames_dropped,
+                'latency_ms': round((time.time() - item.timestamp) * 1000, 1)
+            }
+            if recorder is not None:
+                detections['recording'] = recorder.recording
+            if inferred or detections['alert'] is not None:
+                EVENT_STORE.append(summarize(camera_id, item.timestamp, detections))
+            if not send_objects:
+                # Leave the key out of the payload entirely (copy: last_detections keeps it)
+                detections = {k: v for k, v in detections.items() if k != 'objects'}
+            await publish_frame(loop, camera_id, item, frame, detections, capture_info, recorder, quality)
+            FRAMES_PROCESSED.inc(camera_id)
+            STAGE_SECONDS.observe(time.time() - item.timestamp, camera_id, 'total')
 
     finally:
-        cap.release()
+        release_camera(camera_id)
+        CAPTURE_WORKERS.pop(camera_id, None)
+        await loop.run_in_executor(None, worker.stop)
+        if recorder is not None:
+            await loop.run_in_executor(None, recorder.close)
         logging.info(f"Camera {camera_id} stopped")
 
 
@@ -277,7 +636,8 @@ def scan_yolo_models():
                     models.append({
                         "name": pt_file.stem,
                         "path": rel_path,
-                        "full_path": str(pt_file.absolute())
+                        "full_path": str(pt_file.absolute()),
+                        "runtimes": list_runtime_variants(pt_file)
                     })
                     found_paths.add(rel_path)
     
@@ -290,7 +650,8 @@ def scan_yolo_models():
                 models.append({
                     "name": model_path.stem,
                     "path": rel_path,
-                    "full_path": str(model_path.absolute())
+                    "full_path": str(model_path.absolute()),
+                    "runtimes": list_runtime_variants(model_path)
                 })
                 found_paths.add(rel_path)
     
@@ -302,9 +663,15 @@ def scan_yolo_models():
     return models
 
 
-def switch_model(model_path):
-    """Switch to a different YOLO model"""
-    global model, current_model_path
+def switch_model(model_path, runtime=None):
+    """Switch to a different YOLO model, optionally under a different runtime.
+
+    Loads (or takes from MODEL_CACHE) and warms the model first, then swaps the
+    global reference in one assignment, so in-flight batches finish on the old
+    model and the next batch uses the new one. Blocking; run it in an executor.
+    """
+    global model, current_model_path, current_runtime
+    runtime = runtime or current_runtime
     try:
         # Ensure path is correct (handle relative paths)
         base_path = Path(__file__).parent
@@ -314,12 +681,20 @@ def switch_model(model_path):
             logging.error(f"Model file not found: {full_path}")
             return False
         
-        # Load the new model
-        new_model = YOLO(str(full_path))
+        cache_key = (str(full_path), runtime)
+        new_model = MODEL_CACHE.get(cache_key)
+        if new_model is None:
+            # Load the new model (exports and caches ONNX/OpenVINO variants on first use)
+            new_model = load_model(full_path, runtime, device)
+            warm_up(new_model)
+            MODEL_CACHE.put(cache_key, new_model, estimate_model_bytes(new_model, full_path))
+        else:
+            logging.info(f"♻️ Using cached model: {model_path} ({runtime})")
+
         model = new_model
-        model.to("cuda")
         current_model_path = model_path
-        logging.info(f"✅ Successfully switched to model: {model_path}")
+        current_runtime = runtime
+        logging.info(f"✅ Successfully switched to model: {model_path} ({runtime})")
         return True
     except Exception as e:
         logging.error(f"❌ Failed to load model {model_path}: {e}")
@@ -328,8 +703,58 @@ def switch_model(model_path):
         return False
 
 
+def broadcast(payload, priority=True):
+    """Serialize once and queue a message for every connected client"""
+    message = json.dumps(payload)
+    for session in list(CONNECTED_CLIENTS.values()):
+        session.enqueue(message, priority=priority)
+
+
+async def hot_swap_model(model_path, runtime=None):
+    """Load a model in the background and tell every client how it went"""
+    async with MODEL_SWAP_LOCK:
+        broadcast({
+            'type': 'model_loading',
+            'model_path': model_path,
+            'runtime': runtime or current_runtime,
+            'message': f'Loading {model_path}...'
+        })
+        if EXECUTION_MODE == "process":
+            success = await switch_worker_model(model_path, runtime)
+        else:
+            success = await asyncio.get_running_loop().run_in_executor(
+                None, switch_model, model_path, runtime
+            )
+        if success:
+            broadcast({
+                'type': 'model_switched',
+                'model_path': model_path,
+                'runtime': current_runtime,
+                'message': f'Successfully switched to {model_path} ({current_runtime})'
+            })
+        else:
+            broadcast({
+                'type': 'error',
+                'message': f'Failed to switch to model: {model_path}'
+            })
+
+
+async def profile_session(session, seconds, interval):
+    """Run a profiling session in a worker thread and send the summary to the requester"""
+    loop = asyncio.get_running_loop()
+    try:
+        summary = await loop.run_in_executor(None, PROFILER.run, seconds, interval)
+        message = {'type': 'profile_result', **summary}
+    except Exception as e:
+        logging.error(f"Profiling failed: {e}")
+        message = {'type': 'error', 'message': f"Profiling failed: {e}"}
+    session.enqueue(json.dumps(message), priority=True)
+
+
 async def handle_client(websocket):
-    CONNECTED_CLIENTS.add(websocket)
+    session = ClientSession(websocket, max_queue=CLIENT_QUEUE_SIZE, lag_histogram=CLIENT_SEND_LAG)
+    session.start()
+    CONNECTED_CLIENTS[websocket] = session
     logging.info(f"Client connected. Total: {len(CONNECTED_CLIENTS)}")
 
     try:
@@ -337,19 +762,25 @@ async def handle_client(websocket):
             data = json.loads(message)
 
             if data.get('command') == 'innit':
+                # Clients that understand protocol.py can opt in to binary frames
+                session.options['binary_frames'] = bool(data.get('binary_frames'))
                 # Scan for available models
                 available_models = scan_yolo_models()
                 await websocket.send(json.dumps({
                     'type': 'innit',
                     'cameras': num_of_cameras,
-                    'camera_ids': list(range(num_of_cameras)),
+                    'camera_ids': CAMERA_IDS,
+                    'sources': {cid: camera_settings(CAMERA_CONFIG, cid)['source'] for cid in CAMERA_IDS},
                     'available_models': available_models,
-                    'current_model': current_model_path
+                    'current_model': current_model_path,
+                    'current_runtime': current_runtime,
+                    'runtimes': list(RUNTIMES),
+                    'binary_frames': session.options['binary_frames']
                 }))
 
             elif data.get('command') == 'start_cameras':
                 camera_details = []
-                available_cameras = range(num_of_cameras) # generate camera IDs based on num_of_cameras
+                available_cameras = CAMERA_IDS  # from cameras.yml sources, or 0..N-1 from argv
 
                 # Start each detected camera if not already active
                 for cam_id in available_cameras:
@@ -385,36 +816,151 @@ async def handle_client(websocket):
             
             elif data.get('command') == 'switch_model':
                 model_path = data.get('model_path')
+                runtime = data.get('runtime')
                 if model_path:
-                    success = switch_model(model_path)
-                    if success:
-                        await websocket.send(json.dumps({
-                            'type': 'model_switched',
-                            'model_path': model_path,
-                            'message': f'Successfully switched to {model_path}'
-                        }))
-                    else:
-                        await websocket.send(json.dumps({
-                            'type': 'error',
-                            'message': f'Failed to switch to model: {model_path}'
-                        }))
+                    # Load in the background; cameras keep running on the old model until the swap,
+                    # and progress goes to every client as model_loading / model_switched
+                    task = asyncio.create_task(hot_swap_model(model_path, runtime))
+                    BACKGROUND_TASKS.add(task)
+                    task.add_done_callback(BACKGROUND_TASKS.discard)
                 else:
                     await websocket.send(json.dumps({
                         'type': 'error',
                         'message': 'No model_path provided'
                     }))
 
+            elif data.get('command') == 'subscribe':
+                # Stream profile: cameras, max size, max fps, JPEG quality or detections only
+                try:
+                    profile = normalize_profile(data)
+                except (TypeError, ValueError) as e:
+                    await websocket.send(json.dumps({
+                        'type': 'error',
+                        'message': f"subscribe: {e}"
+                    }))
+                else:
+                    session.profile = profile
+                    await websocket.send(json.dumps({
+                        'type': 'subscribed',
+                        'profile': session.profile
+                    }))
+
+            elif data.get('command') == 'client_stats':
+                await websocket.send(json.dumps({
+                    'type': 'client_stats',
+                    'clients': [s.stats() for s in CONNECTED_CLIENTS.values()]
+                }))
+
+            elif data.get('command') == 'model_cache':
+                await websocket.send(json.dumps({
+                    'type': 'model_cache',
+                    **MODEL_CACHE.stats()
+                }))
+
+            elif data.get('command') == 'metrics':
+                await websocket.send(json.dumps({
+                    'type': 'metrics',
+                    'metrics': METRICS.snapshot(),
+                    'scheduler': INFERENCE_SCHEDULER.stats()
+                }))
+
+            elif data.get('command') == 'profile':
+                # Time-boxed sampling profile of every thread; the pipeline keeps running
+                try:
+                    seconds = float(data.get('seconds', 10))
+                    interval_ms = float(data.get('interval_ms', 5))
+                    if not (math.isfinite(seconds) and math.isfinite(interval_ms)):
+                        raise ValueError
+                except (TypeError, ValueError):
+                    seconds = interval_ms = None
+                if seconds is None:
+                    await websocket.send(json.dumps({
+                        'type': 'error',
+                        'message': 'profile: seconds and interval_ms must be numbers'
+                    }))
+                elif PROFILER.active:
+                    await websocket.send(json.dumps({
+                        'type': 'error',
+                        'message': 'A profiling session is already running'
+                    }))
+                else:
+                    seconds = min(PROFILE_MAX_SECONDS, max(1.0, seconds))
+                    interval = max(1.0, interval_ms) / 1000
+                    task = asyncio.create_task(profile_session(session, seconds, interval))
+                    BACKGROUND_TASKS.add(task)
+                    task.add_done_callback(BACKGROUND_TASKS.discard)
+                    await websocket.send(json.dumps({
+                        'type': 'profile_started',
+                        'seconds': seconds,
+                        'interval_ms': interval * 1000
+                    }))
+
+            elif data.get('command') == 'query_events':
+                # counts / alerts / hourly over the detection history, off the event loop
+                kind = data.get('kind', 'counts')
+                try:
+                    rows = await asyncio.get_running_loop().run_in_executor(
+                        None, functools.partial(EVENT_STORE.query, kind, data.get('start'), data.get('end'),
+                                                data.get('cameras'), int(data.get('limit', 500)))
+                    )
+                    await websocket.send(json.dumps({
+                        'type': 'events',
+                        'kind': kind,
+                        'request_id': data.get('request_id'),
+                        'rows': rows
+                    }))
+                except Exception as e:
+                    # Bad input or a failed scan must not take the connection (and cameras) down
+                    logging.warning(f"Event query {kind} failed: {e}")
+                    await websocket.send(json.dumps({
+                        'type': 'error',
+                        'message': f"Event query failed: {e}"
+                    }))
+
     except websockets.exceptions.ConnectionClosed:
         logging.info("Client disconnected")
     finally:
-        CONNECTED_CLIENTS.discard(websocket)
+        CONNECTED_CLIENTS.pop(websocket, None)
+        await session.close()
         if not CONNECTED_CLIENTS:
             for cam_id, task in ACTIVE_CAMERAS.items():
                 task.cancel()
             ACTIVE_CAMERAS.clear()
 
 
+def serve_metrics(connection, request):
+    """Answer plain HTTP GET /metrics on the WebSocket port; everything else is a WebSocket"""
+    if request.path.split('?', 1)[0] != '/metrics':
+        return None
+    response = connection.respond(HTTPStatus.OK, METRICS.render())
+    del response.headers['Content-Type']
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return response
+
+
 async def main():
+    global INFERENCE_SCHEDULER, INFERENCE_EXECUTOR, STAGE_EXECUTOR
+    INFERENCE_EXECUTOR = create_executor(EXECUTION_MODE, INFERENCE_WORKERS)
+    STAGE_EXECUTOR = create_executor(EXECUTION_MODE, STAGE_WORKERS)
+    logging.info(f"Execution mode: {EXECUTION_MODE} "
+                 f"({INFERENCE_WORKERS} inference / {STAGE_WORKERS} stage workers)")
+
+    INFERENCE_SCHEDULER = InferenceScheduler(
+        run_batch_inference,
+        max_batch_size=INFERENCE_MAX_BATCH,
+        max_wait=INFERENCE_MAX_WAIT,
+        expected_cameras=lambda: len(ACTIVE_CAMERAS),
+        # One batch per inference worker process can run at once
+        max_in_flight=INFERENCE_WORKERS
+    )
+    INFERENCE_SCHEDULER.start()
+    EVENT_STORE.start()
+    if EXECUTION_MODE == "process":
+        # Workers load their copy of the model now instead of on the first camera's first batch
+        task = asyncio.create_task(switch_worker_model(current_model_path, current_runtime))
+        BACKGROUND_TASKS.add(task)
+        task.add_done_callback(BACKGROUND_TASKS.discard)
+
     # Scan for available models on startup
     available_models = scan_yolo_models()
     if available_models:
@@ -423,9 +969,15 @@ async def main():
     else:
         logging.warning("No YOLO models found in repository")
     
-    async with websockets.serve(handle_client, "localhost", 8765):
-        logging.info("Server running at ws://localhost:8765")
-        await asyncio.Future()
+    try:
+        async with websockets.serve(handle_client, "localhost", 8765, process_request=serve_metrics):
+            logging.info("Server running at ws://localhost:8765 (metrics at http://localhost:8765/metrics)")
+            await asyncio.Future()
+    finally:
+        INFERENCE_SCHEDULER.stop()
+        EVENT_STORE.close()
+        INFERENCE_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        STAGE_EXECUTOR.shutdown(wait=False, cancel_futures=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,144 @@
+"""
+Per-camera configuration for the backend.
+
+Settings are read from cameras.yml next to backend.py (or the file named by
+the CAMERA_CONFIG environment variable). The file is optional; anything it
+leaves out falls back to DEFAULT_CAMERA_CONFIG. Layout:
+
+    defaults:            # applied to every camera
+      motion:
+        threshold: 0.01
+    cameras:
+      0:                 # camera id
+        source: 0        # device index, video file, image directory or URL (sources.py)
+        motion:
+          mask: [[[0.5, 0], [1, 0], [1, 1], [0.5, 1]]]
+
+If any camera has a 'source', the cameras listed here are the cameras the
+backend runs; otherwise it runs devices 0..N-1 from the command line count.
+
+See cameras.example.yml for every supported key.
+"""
+
+import copy
+import logging
+import os
+from pathlib import Path
+
+import yaml
+
+DEFAULT_CAMERA_CONFIG = {
+    'source': None,                # None = the local device with the camera's id
+    'detection': {
+        'classes': None,           # class names or ids the model may return; None = all
+        'conf': None,              # model confidence threshold; None = model default (0.25)
+        'iou': None,               # NMS IoU threshold; None = model default (0.7)
+        'max_det': None,           # most boxes per frame; None = model default (300)
+        'send_objects': True,      # False: no 'objects' list (chairs, cups, ...) in client payloads
+    },
+    'motion': {
+        'enabled': True,
+        'threshold': 0.005,        # fraction of watched pixels that must change
+        'pixel_threshold': 25,     # per-pixel grey-level difference that counts as change
+        'downscale_width': 160,    # motion runs on a small greyscale copy of the frame
+        'learning_rate': 0.05,     # how fast the background model adapts
+        'max_skip_seconds': 2.0,   # always run full inference at least this often
+        'mask': [],                # polygons (normalized 0-1 coords) to watch; empty = whole frame
+    },
+    'stride': {
+        'enabled': True,
+        'max_fps': 15.0,           # inference rate while a weapon alert is active
+        'active_fps': 8.0,         # rate with people present or motion, before CPU throttling
+        'idle_fps': 2.0,           # rate for quiet cameras
+        'cpu_high': 85.0,          # CPU percent at which active cameras are throttled hardest
+        'cpu_low': 60.0,           # CPU percent below which there is no throttling
+    },
+    'tracker': {
+        'enabled': True,
+        'iou_threshold': 0.3,      # minimum IoU to continue a track
+        'max_misses': 2,           # inference frames in a row a track survives unmatched
+        'min_hits': 2,             # matches before a track counts towards people_count
+        'alpha': 0.85,             # alpha-beta filter position gain
+        'beta': 0.3,               # alpha-beta filter velocity gain
+    },
+    'recording': {
+        'enabled': True,
+        'preroll_seconds': 10.0,   # footage kept in memory before an alert
+        'postroll_seconds': 5.0,   # keep recording this long after the alert clears
+        'max_buffer_mb': 32,       # hard cap on pre-roll memory per camera
+        'max_width': 1280,         # recorded frame size and quality
+        'max_height': 720,
+        'jpeg_quality': 80,
+        'fps': 5.0,                # recorded frames per second (each costs an extra encode)
+        'output_dir': 'recordings',
+    },
+    'zones': {
+        'areas': [],               # polygons or {rect: [x1, y1, x2, y2]} (normalized); empty = whole frame
+        'padding': 0.05,           # margin around the zones' bounding box for the inference crop
+        'anchor': 'center',        # box point that must be inside a zone: center or bottom
+    },
+    'tiling': {
+        'enabled': False,          # extra tiled pass for small weapons in high-resolution frames
+        'mode': 'grid',            # grid: tile the whole frame; people: crop around each person
+        'tile_size': 640,          # grid tile edge in pixels
+        'overlap': 0.2,            # fraction shared between neighbouring tiles
+        'max_tiles': 16,           # most crops per frame (grid tiles grow to stay under it)
+        'include_full_frame': True,  # grid mode: people/objects from the whole frame, tiles add weapons
+        'person_margin': 0.25,     # people mode: context added around each person box, per side
+        'nms_iou': 0.5,            # merge same-class boxes from different tiles above this IoU
+    },
+    'cascade': {
+        'enabled': False,          # weapons from a second, heavier model run only on person crops
+        'weapon_model': 'runs/detect/security_detector/weights/best.pt',
+        'weapon_classes': ['weapon', 'knife', 'scissors', 'baseball bat'],  # its class names that count
+        'conf': 0.35,              # weapon model confidence threshold
+        'crop_size': 320,          # person crops are letterboxed to this square and batched
+        'margin': 0.2,             # context around each person box, per side
+        'max_crops': 8,            # most people per frame checked, largest first
+        'nms_iou': 0.5,            # merge the same weapon seen in overlapping crops
+    },
+    'encoding': {
+        'target_kb': None,         # average JPEG size to aim for per streamed frame; None = fixed quality
+        'min_quality': 40,         # adaptive quality never goes below this
+    },
+}
+
+
+def _merge(base, override):
+    """Recursively merge override into a copy of base"""
+    merged = copy.deepcopy(base)
+    for key, value in (override or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def load_camera_config(path=None):
+    """Load the camera config file, returning an empty config if there is none"""
+    if path is None:
+        path = os.environ.get("CAMERA_CONFIG", Path(__file__).parent / "cameras.yml")
+    path = Path(path)
+    if not path.exists():
+        logging.info(f"No camera config at {path}, using defaults")
+        return {}
+    with open(path) as f:
+        config = yaml.safe_load(f) or {}
+    logging.info(f"Loaded camera config from {path}")
+    return config
+
+
+def camera_settings(config, camera_id):
+    """Resolve the full settings for one camera: built-in defaults < file defaults < camera entry"""
+    cameras = config.get('cameras') or {}
+    entry = cameras.get(camera_id, cameras.get(str(camera_id), {}))
+    return _merge(_merge(DEFAULT_CAMERA_CONFIG, config.get('defaults')), entry)
+
+
+def configured_camera_ids(config, default_count):
+    """Camera ids to run: the configured ones if any camera names a source, else 0..default_count-1"""
+    cameras = config.get('cameras') or {}
+    if any(isinstance(entry, dict) and entry.get('source') is not None for entry in cameras.values()):
+        return sorted(int(camera_id) for camera_id in cameras)
+    return list(range(default_count))
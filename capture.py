@@ -0,0 +1,155 @@
+"""
+Threaded camera capture with latest-frame-only buffers.
+
+One CaptureWorker thread per camera reads continuously so the driver queue
+never backs up. Each read overwrites a single-slot LatestFrameBuffer; the
+processing side always takes the freshest frame and the buffer counts how
+many frames were overwritten before anyone took them. Where the frames come
+from (device, file, image directory, stream) is up to the FrameSource, see
+sources.py.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from sources import FrameSource, make_source
+
+FrameItem = namedtuple('FrameItem', ['frame', 'seq', 'timestamp'])
+
+
+class LatestFrameBuffer:
+    """Single-slot buffer: writers overwrite, readers take the newest frame"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frame = None
+        self._seq = 0
+        self._timestamp = None
+        self._taken_seq = 0
+        self._taken = threading.Event()
+        self._loop = None
+        self._event = None
+
+        # Stats
+        self.frames_put = 0
+        self.frames_dropped = 0
+
+    def bind(self, loop):
+        """Let put() wake up an asyncio consumer running on this loop"""
+        self._loop = loop
+        self._event = asyncio.Event()
+
+    def put(self, frame, timestamp=None):
+        """Store a new frame, replacing whatever was there"""
+        with self._lock:
+            self._seq += 1
+            self._frame = frame
+            self._timestamp = timestamp if timestamp is not None else time.time()
+            self.frames_put += 1
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._event.set)
+            except RuntimeError:
+                # Event loop already closed during shutdown
+                pass
+
+    def take(self):
+        """Return the newest frame not yet taken, or None if nothing new arrived"""
+        with self._lock:
+            if self._seq == self._taken_seq:
+                return None
+            self.frames_dropped += self._seq - self._taken_seq - 1
+            self._taken_seq = self._seq
+            self._taken.set()
+            return FrameItem(self._frame, self._seq, self._timestamp)
+
+    def wait_taken(self, timeout=None):
+        """Block until the newest frame has been taken. Returns False on timeout."""
+        with self._lock:
+            if self._seq == self._taken_seq:
+                return True
+            self._taken.clear()
+        return self._taken.wait(timeout)
+
+    async def next(self, timeout=None):
+        """Wait for a frame newer than the last one taken. Returns None on timeout."""
+        while True:
+            self._event.clear()
+            item = self.take()
+            if item is not None:
+                return item
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return None
+
+
+class CaptureWorker:
+    """Dedicated capture thread for one camera"""
+
+    def __init__(self, camera_id, source=None):
+        """
+        Args:
+            camera_id: Camera this worker feeds
+            source: A FrameSource, or a cameras.yml source spec (None = device camera_id)
+        """
+        self.camera_id = camera_id
+        self.source = source if isinstance(source, FrameSource) else make_source(source, camera_id)
+        self.buffer = LatestFrameBuffer()
+        self.read_failures = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def open(self):
+        """Open the source. Blocking, so call it from an executor."""
+        return self.source.open()
+
+    def start(self, loop):
+        """Start reading frames in the background"""
+        self.buffer.bind(loop)
+        self._thread = threading.Thread(
+            target=self._run, name=f"capture-{self.camera_id}", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def running(self):
+        """False once the capture thread has exited (source finished, or it died)"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        """Stop the capture thread and release the device"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        self.source.release()
+
+    def _run(self):
+        while not self._stop.is_set():
+            ret, frame = self.source.read()
+            if not ret:
+                if self.source.finished:
+                    logging.info(f"Camera {self.camera_id} source finished: {self.source.describe()}")
+                    return
+                self.read_failures += 1
+                logging.warning(f"Camera {self.camera_id} failed to read frame")
+                time.sleep(0.1)
+                continue
+            if self.source.lockstep:
+                # Replay every frame: wait until the pipeline has taken the previous one
+                while not self.buffer.wait_taken(timeout=0.1):
+                    if self._stop.is_set():
+                        return
+            self.buffer.put(frame)
+
+    def stats(self):
+        """Per-camera capture counters"""
+        return {
+            'frames_captured': self.buffer.frames_put,
+            'frames_dropped': self.buffer.frames_dropped,
+            'read_failures': self.read_failures,
+            'source': self.source.describe(),
+        }
@@ -0,0 +1,95 @@
+"""
+Two-stage cascade: a cheap person gate, then a heavier weapon model on person crops.
+
+The normally loaded model (e.g. yolov8n) runs on every frame as usual and
+finds people. Only when people are present, the region around each one is
+cropped, letterboxed to a fixed crop_size square and sent through the weapon
+model (e.g. the 3-class security_detector from scripts/train_security.py) as
+one batch. The weapon boxes are mapped back to frame coordinates, merged
+across overlapping crops, and replace whatever weapons the gate model found.
+No people means no weapon pass and no weapons.
+"""
+
+import cv2
+import numpy as np
+
+from tiling import nms, person_tiles
+
+
+def pad_crop(frame, box, size):
+    """Crop box from the frame and letterbox it to size x size.
+
+    Returns:
+        tuple: (canvas, scale, offset_x, offset_y) where a point (x, y) on the
+            canvas is at ((x - offset_x) / scale + box x1, ...) in the frame
+    """
+    x1, y1, x2, y2 = box
+    crop = frame[y1:y2, x1:x2]
+    h, w = crop.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    left, top = (size - new_w) // 2, (size - new_h) // 2
+    canvas[top:top + new_h, left:left + new_w] = cv2.resize(crop, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    return canvas, scale, left, top
+
+
+class WeaponCascade:
+    def __init__(self, weapon_model, weapon_classes=('weapon', 'knife', 'scissors', 'baseball bat'),
+                 conf=0.35, crop_size=320, margin=0.2, max_crops=8, nms_iou=0.5, **_):
+        """
+        Args:
+            weapon_model (str): Weights of the second-stage model
+            weapon_classes (list): Class names of that model that count as weapons
+            conf (float): Confidence threshold for the weapon model
+            crop_size (int): Every person crop is letterboxed to this square
+            margin (float): Context added around each person box, per side (hands, carried items)
+            max_crops (int): Most people per frame sent to the weapon model, largest first
+            nms_iou (float): Merge boxes of the same weapon seen in overlapping crops
+        """
+        self.weapon_model = weapon_model
+        self.weapon_names = frozenset(name.lower() for name in weapon_classes)
+        self.conf = conf
+        self.crop_size = crop_size
+        self.margin = margin
+        self.max_crops = max_crops
+        self.nms_iou = nms_iou
+
+        # Stats
+        self.frames_gated = 0
+        self.crops_run = 0
+
+    async def detect(self, frame, detections, infer_crops):
+        """Replace the gate's weapons with the weapon model's, run on crops around each person.
+
+        Args:
+            infer_crops: async (crops, imgsz, conf, weapon_names) -> weapons per crop, in crop coords
+        """
+        if not detections['people']:
+            self.frames_gated += 1
+            detections['weapons'] = []
+            return detections
+
+        boxes = person_tiles(detections['people'], frame.shape, self.margin, self.max_crops)
+        padded = [pad_crop(frame, box, self.crop_size) for box in boxes]
+        results = await infer_crops([canvas for canvas, _, _, _ in padded], self.crop_size, self.conf,
+                                    self.weapon_names)
+        self.crops_run += len(padded)
+
+        weapons = []
+        for (x1, y1, _, _), (_, scale, left, top), found in zip(boxes, padded, results):
+            for weapon in found:
+                cx1, cy1, cx2, cy2 = weapon['bbox']
+                weapon['bbox'] = [(cx1 - left) / scale + x1, (cy1 - top) / scale + y1,
+                                  (cx2 - left) / scale + x1, (cy2 - top) / scale + y1]
+                weapons.append(weapon)
+
+        merged = []
+        by_name = {}
+        for weapon in weapons:
+            by_name.setdefault(weapon['name'], []).append(weapon)
+        for group in by_name.values():
+            keep = nms([w['bbox'] for w in group], np.array([w['confidence'] for w in group]), self.nms_iou)
+            merged.extend(group[i] for i in keep)
+        detections['weapons'] = merged
+        return detections
@@ -0,0 +1,184 @@
+"""
+Per-client outbound queues for the WebSocket server.
+
+Every connected client gets a ClientSession with a bounded queue and its
+own writer task, so one slow client can't hold up the others or the
+camera loops. Messages are serialized once by the caller and the same
+object is queued for every client. When a queue is full the oldest video
+frame is dropped first; priority messages (alerts) are never dropped.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+
+import websockets
+
+_client_ids = itertools.count(1)
+
+# What a client receives unless it subscribes with its own profile:
+# every camera, full resolution, JPEG quality 85, no frame rate cap.
+DEFAULT_PROFILE = {
+    'cameras': None,           # list of camera ids, or None for all
+    'max_width': None,         # downscale to fit (never upscale); None = full resolution
+    'max_height': None,
+    'max_fps': None,           # per camera; None = every frame
+    'jpeg_quality': 85,
+    'detections_only': False,  # send detections without pixels
+}
+
+
+def normalize_profile(request):
+    """Build a stream profile from a subscribe command, filling in defaults.
+    Raises ValueError or TypeError on values that can't be used."""
+    profile = dict(DEFAULT_PROFILE)
+    for key in profile:
+        if request.get(key) is not None:
+            profile[key] = request[key]
+    if profile['cameras'] is not None:
+        if not isinstance(profile['cameras'], list):
+            raise TypeError("cameras must be a list of camera ids")
+        profile['cameras'] = [int(c) for c in profile['cameras']]
+    for key in ('max_width', 'max_height'):
+        if profile[key] is not None:
+            profile[key] = max(16, int(profile[key]))
+    if profile['max_fps'] is not None:
+        max_fps = float(profile['max_fps'])
+        if max_fps < 0 or max_fps != max_fps:
+            raise ValueError("max_fps must be a positive number, or 0 for no cap")
+        # 0 means no cap, like leaving it out
+        profile['max_fps'] = max(0.1, max_fps) if max_fps > 0 else None
+    profile['jpeg_quality'] = min(100, max(10, int(profile['jpeg_quality'])))
+    profile['detections_only'] = bool(profile['detections_only'])
+    return profile
+
+
+def encode_variant(profile):
+    """Key for the JPEG a profile needs; clients with the same key share one encode.
+    None means the profile needs no pixels at all."""
+    if profile['detections_only']:
+        return None
+    return (profile['max_width'], profile['max_height'], profile['jpeg_quality'])
+
+
+class ClientSession:
+    def __init__(self, websocket, max_queue=8, lag_histogram=None):
+        """
+        Args:
+            websocket: The server-side connection
+            max_queue (int): Queued video frames allowed before dropping old ones
+            lag_histogram: Optional metrics.Histogram to record queue-to-send lag in seconds
+        """
+        self.websocket = websocket
+        self.lag_histogram = lag_histogram
+        self.client_id = next(_client_ids)
+        self.max_queue = max_queue
+        self.options = {'binary_frames': False}
+        self.profile = dict(DEFAULT_PROFILE)
+        self._last_frame_sent = {}  # {camera_id: time} for max_fps
+        self.connected_at = time.time()
+
+        self._queue = deque()  # (message, priority, enqueued_at)
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.closed = False
+
+        # Stats
+        self.messages_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+
+    def start(self):
+        """Start the writer task for this client"""
+        self._task = asyncio.create_task(self._writer())
+
+    async def close(self):
+        """Stop the writer task and discard anything still queued"""
+        self.closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._queue.clear()
+
+    def wants_camera(self, camera_id):
+        """True if this client's profile subscribes to the camera"""
+        cameras = self.profile['cameras']
+        return cameras is None or camera_id in cameras
+
+    def frame_due(self, camera_id, now):
+        """Apply the profile's max_fps: True if it is time to send this camera again"""
+        max_fps = self.profile['max_fps']
+        if max_fps is None:
+            return True
+        if now - self._last_frame_sent.get(camera_id, 0.0) < 1.0 / max_fps:
+            return False
+        self._last_frame_sent[camera_id] = now
+        return True
+
+    def _drop_oldest_frame(self):
+        """Remove the oldest non-priority message. Returns False if only priority ones are left."""
+        for i, (_, priority, _) in enumerate(self._queue):
+            if not priority:
+                del self._queue[i]
+                self.frames_dropped += 1
+                return True
+        return False
+
+    def enqueue(self, message, priority=False):
+        """Queue an already-serialized message without waiting for the network.
+
+        Returns:
+            bool: False if the message was dropped because the client is behind
+        """
+        if self.closed:
+            return False
+        frames_queued = sum(1 for _, p, _ in self._queue if not p)
+        if not priority and frames_queued >= self.max_queue:
+            if not self._drop_oldest_frame():
+                self.frames_dropped += 1
+                return False
+        self._queue.append((message, priority, time.perf_counter()))
+        self._wakeup.set()
+        return True
+
+    async def _writer(self):
+        try:
+            while True:
+                while not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                message, _, enqueued_at = self._queue.popleft()
+                await self.websocket.send(message)
+
+                self.messages_sent += 1
+                self.bytes_sent += len(message)
+                lag = time.perf_counter() - enqueued_at
+                self.last_lag_ms = lag * 1000
+                if self.lag_histogram is not None:
+                    self.lag_histogram.observe(lag)
+                self.max_lag_ms = max(self.max_lag_ms, self.last_lag_ms)
+        except websockets.exceptions.ConnectionClosed:
+            logging.info(f"Client {self.client_id} writer stopped: connection closed")
+            self.closed = True
+
+    def stats(self):
+        """Per-client send metrics"""
+        return {
+            'client_id': self.client_id,
+            'queue_depth': len(self._queue),
+            'messages_sent': self.messages_sent,
+            'bytes_sent': self.bytes_sent,
+            'frames_dropped': self.frames_dropped,
+            'last_lag_ms': round(self.last_lag_ms, 1),
+            'max_lag_ms': round(self.max_lag_ms, 1),
+            'binary_frames': self.options.get('binary_frames', False),
+            'profile': self.profile,
+            'connected_seconds': round(time.time() - self.connected_at, 1),
+        }
@@ -0,0 +1,151 @@
+"""
+Pluggable JPEG encoders and per-camera adaptive quality.
+
+The encoder is picked once per process (each worker in process mode picks
+its own): PyTurboJPEG if installed, then simplejpeg, then OpenCV. Both
+libjpeg-turbo bindings encode BGR arrays directly and release the GIL, so
+several STAGE_EXECUTOR threads can encode at once. Set JPEG_ENCODER to
+'turbojpeg', 'simplejpeg' or 'opencv' to force one.
+
+AdaptiveQuality keeps one quality per stream variant of a camera and nudges
+it after every frame so the average JPEG size settles at the camera's
+target_kb budget, never above the quality the client asked for.
+"""
+
+import importlib.util
+import logging
+import os
+
+import cv2
+
+_ENCODER = None
+_ENCODER_NAME = None
+
+
+def _turbojpeg():
+    from turbojpeg import TJPF_BGR, TJSAMP_420, TurboJPEG
+    jpeg = TurboJPEG()
+
+    def encode(frame, quality):
+        return jpeg.encode(frame, quality=quality, pixel_format=TJPF_BGR, jpeg_subsample=TJSAMP_420)
+    return encode
+
+
+def _simplejpeg():
+    import simplejpeg
+
+    def encode(frame, quality):
+        return simplejpeg.encode_jpeg(frame, quality=quality, colorspace='BGR', colorsubsampling='420')
+    return encode
+
+
+def _opencv():
+    def encode(frame, quality):
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return buffer.tobytes()
+    return encode
+
+
+# In order of preference for 'auto'
+ENCODERS = {
+    'turbojpeg': ('turbojpeg', _turbojpeg),
+    'simplejpeg': ('simplejpeg', _simplejpeg),
+    'opencv': ('cv2', _opencv),
+}
+
+
+def available_encoders():
+    """Encoders whose package is installed"""
+    return [name for name, (package, _) in ENCODERS.items() if importlib.util.find_spec(package)]
+
+
+def get_encoder():
+    """This process's encode(frame, quality) -> bytes, created on first use"""
+    global _ENCODER, _ENCODER_NAME
+    if _ENCODER is None:
+        requested = os.environ.get("JPEG_ENCODER", "auto")
+        candidates = available_encoders() if requested == "auto" else [requested, 'opencv']
+        for name in candidates:
+            try:
+                _ENCODER = ENCODERS[name][1]()
+                _ENCODER_NAME = name
+                break
+            except Exception as e:
+                # e.g. the binding is installed but libturbojpeg itself is missing
+                logging.warning(f"JPEG encoder '{name}' unavailable: {e}")
+        logging.info(f"JPEG encoder: {_ENCODER_NAME}")
+    return _ENCODER
+
+
+def encoder_name():
+    get_encoder()
+    return _ENCODER_NAME
+
+
+class QualityController:
+    """Steers JPEG quality so the smoothed frame size tracks a byte budget"""
+
+    def __init__(self, target_bytes, min_quality=40, max_quality=90, smoothing=0.3):
+        self.target_bytes = target_bytes
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.smoothing = smoothing
+        self.quality = max_quality
+        self.avg_bytes = None
+
+    def update(self, size):
+        """Feed the size of the frame just encoded at self.quality"""
+        if self.avg_bytes is None:
+            self.avg_bytes = size
+        else:
+            self.avg_bytes += self.smoothing * (size - self.avg_bytes)
+        ratio = self.avg_bytes / self.target_bytes
+        if ratio > 1.05:
+            step = -max(1, round(min(10.0, (ratio - 1.0) * 20)))
+        elif ratio < 0.85:
+            step = max(1, round(min(5.0, (1.0 - ratio) * 10)))
+        else:
+            step = 0
+        self.quality = int(min(self.max_quality, max(self.min_quality, self.quality + step)))
+
+
+class AdaptiveQuality:
+    def __init__(self, target_kb=None, min_quality=40, **_):
+        """
+        Args:
+            target_kb (float): Average JPEG size to aim for per frame; None keeps fixed qualities
+            min_quality (int): Never go below this, even if the budget is exceeded
+        """
+        self.enabled = target_kb is not None
+        self.target_bytes = int(target_kb * 1024) if self.enabled else None
+        self.min_quality = min_quality
+        self._controllers = {}  # {variant: QualityController}
+
+    def plan(self, variants):
+        """Quality to encode each (max_width, max_height, quality) variant at this frame"""
+        if not self.enabled:
+            return {variant: variant[2] for variant in variants}
+        plan = {}
+        for variant in variants:
+            controller = self._controllers.get(variant)
+            if controller is None:
+                controller = self._controllers[variant] = QualityController(
+                    self.target_bytes, min(self.min_quality, variant[2]), variant[2]
+                )
+            plan[variant] = controller.quality
+        return plan
+
+    def observe(self, encoded):
+        """Feed back the sizes of the JPEGs from plan()"""
+        if not self.enabled:
+            return
+        for variant, jpeg in encoded.items():
+            controller = self._controllers.get(variant)
+            if controller is not None:
+                controller.update(len(jpeg))
+
+    def stats(self):
+        return {
+            str(list(variant)): {'quality': c.quality, 'avg_kb': round((c.avg_bytes or 0) / 1024, 1)}
+            for variant, c in self._controllers.items()
+        }
@@ -0,0 +1,249 @@
+"""
+Append-only columnar store for detection summaries.
+
+Every inferred frame becomes one row. Rows are queued without blocking and
+written in batches by a background thread as Parquet files partitioned by
+day and camera:
+
+    events/date=2026-10-17/camera=0/part-1760700000123.parquet
+
+Queries only open the partitions inside the requested time range, and the
+writer thread merges each partition's batch files into a single file every
+hour and at midnight, so counts, alert lists and hourly rollups stay fast
+over months of data.
+"""
+
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import polars as pl
+
+SCHEMA = {
+    'ts': pl.Datetime('ms'),
+    'camera_id': pl.Int32,
+    'people_count': pl.Int32,
+    'weapon_count': pl.Int32,
+    'object_count': pl.Int32,
+    'threat_level': pl.Int32,
+    'alert': pl.Boolean,
+    'weapons': pl.Utf8,
+}
+
+
+def summarize(camera_id, timestamp, detections):
+    """One event-store row from a frame's detections"""
+    return {
+        'ts': datetime.fromtimestamp(timestamp),
+        'camera_id': int(camera_id),
+        'people_count': int(detections['people_count']),
+        'weapon_count': len(detections['weapons']),
+        'object_count': len(detections.get('objects', ())),
+        'threat_level': int(detections['threat_level']),
+        'alert': detections['alert'] is not None,
+        'weapons': ','.join(w['name'] for w in detections['weapons']),
+    }
+
+
+def local_naive(value):
+    """A query bound as naive local time, like the stored 'ts' column (accepts ISO strings)"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+
+class EventStore:
+    def __init__(self, root='events', batch_rows=5000, flush_seconds=30.0, compact_seconds=3600.0):
+        """
+        Args:
+            root (str): Directory holding the partitioned Parquet files
+            batch_rows (int): Write as soon as this many rows are waiting
+            flush_seconds (float): Otherwise write at least this often
+            compact_seconds (float): Merge each partition's batch files this often (and at midnight)
+        """
+        self.root = Path(root)
+        self.batch_rows = batch_rows
+        self.flush_seconds = flush_seconds
+        self.compact_seconds = compact_seconds
+        self._queue = queue.Queue()
+        self._thread = None
+        # Held while compaction swaps files and while a query lists and reads them,
+        # so a query never sees a partition both merged and unmerged, or a file vanish
+        self._files_lock = threading.Lock()
+
+        # Stats
+        self.rows_written = 0
+        self.files_written = 0
+        self.compactions = 0
+
+    def start(self):
+        """Start the background writer"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._writer, name="event-store", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Flush everything queued and stop the writer"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'rows_written': self.rows_written,
+            'files_written': self.files_written,
+            'compactions': self.compactions,
+        }
+
+    def append(self, row):
+        """Queue one row; never blocks the caller"""
+        self._queue.put_nowait(row)
+
+    def _writer(self):
+        # Compaction runs here, between flushes, so it never races a batch write
+        self.compact()
+        batch = []
+        deadline = time.monotonic() + self.flush_seconds
+        next_compact = time.monotonic() + self.compact_seconds
+        day = datetime.now().date()
+        while True:
+            try:
+                row = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                row = False
+            if row is None:
+                self._flush(batch)
+                return
+            if row is not False:
+                batch.append(row)
+            if len(batch) >= self.batch_rows or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_seconds
+                if time.monotonic() >= next_compact or datetime.now().date() != day:
+                    self.compact()
+                    next_compact = time.monotonic() + self.compact_seconds
+                    day = datetime.now().date()
+
+    def _partition_dir(self, day, camera_id):
+        return self.root / f"date={day}" / f"camera={camera_id}"
+
+    def _flush(self, batch):
+        """Write a batch as one file per (day, camera) partition"""
+        if not batch:
+            return
+        try:
+            df = pl.DataFrame(batch, schema=SCHEMA)
+            df = df.with_columns(pl.col('ts').dt.date().alias('_day'))
+            for (day, camera_id), part in df.group_by(['_day', 'camera_id']):
+                directory = self._partition_dir(day, camera_id)
+                directory.mkdir(parents=True, exist_ok=True)
+                path = directory / f"part-{int(time.time() * 1000)}-{self.files_written}.parquet"
+                part.drop('_day').sort('ts').write_parquet(path, compression='zstd', statistics=True)
+                self.files_written += 1
+            self.rows_written += len(batch)
+        except Exception as e:
+            logging.error(f"Event store flush of {len(batch)} rows failed: {e}")
+
+    def compact(self):
+        """Merge the small batch files of every partition (today's included) into one file each"""
+        for day_dir in sorted(self.root.glob("date=*")):
+            for camera_dir in day_dir.glob("camera=*"):
+                parts = sorted(camera_dir.glob("*.parquet"))
+                if len(parts) <= 1:
+                    continue
+                try:
+                    merged = pl.concat([pl.read_parquet(p) for p in parts]).sort('ts')
+                    target = camera_dir / "compacted.parquet"
+                    tmp = camera_dir / "compacted.parquet.tmp"
+                    merged.write_parquet(tmp, compression='zstd', statistics=True)
+                    # Publish the merged file before removing its inputs, so a crash
+                    # in between can duplicate rows but never lose them
+                    with self._files_lock:
+                        tmp.replace(target)
+                        for p in parts:
+                            if p != target:
+                                p.unlink()
+                    self.compactions += 1
+                except Exception as e:
+                    logging.error(f"Event store compaction of {camera_dir} failed: {e}")
+
+    def _files(self, start, end, camera_ids):
+        """Parquet files whose partitions overlap [start, end] and the requested cameras"""
+        files = []
+        day = start.date()
+        while day <= end.date():
+            day_dir = self.root / f"date={day.isoformat()}"
+            if day_dir.exists():
+                for camera_dir in day_dir.glob("camera=*"):
+                    camera_id = int(camera_dir.name.split('=', 1)[1])
+                    if camera_ids is None or camera_id in camera_ids:
+                        files.extend(camera_dir.glob("*.parquet"))
+            day += timedelta(days=1)
+        return files
+
+    def scan(self, start, end, camera_ids=None):
+        """Lazy frame over the rows in [start, end], or None if there are none"""
+        files = self._files(start, end, camera_ids)
+        if not files:
+            return None
+        lf = pl.scan_parquet([str(f) for f in files], schema=SCHEMA)
+        lf = lf.filter(pl.col('ts').is_between(start, end))
+        if camera_ids is not None:
+            lf = lf.filter(pl.col('camera_id').is_in(list(camera_ids)))
+        return lf
+
+    def query(self, kind, start=None, end=None, camera_ids=None, limit=500):
+        """Answer a 'counts', 'alerts' or 'hourly' query as plain JSON-ready data"""
+        with self._files_lock:
+            return self._query(kind, start, end, camera_ids, limit)
+
+    def _query(self, kind, start, end, camera_ids, limit):
+        start, end = local_naive(start), local_naive(end)
+        end = end or datetime.now()
+        start = start or datetime.combine(end.date(), datetime.min.time())
+        camera_ids = None if camera_ids is None else [int(c) for c in camera_ids]
+        lf = self.scan(start, end, camera_ids)
+
+        if kind == 'counts':
+            if lf is None:
+                return []
+            df = lf.group_by('camera_id').agg(
+                pl.len().alias('frames'),
+                pl.col('alert').sum().alias('alerts'),
+                (pl.col('weapon_count') > 0).sum().alias('weapon_frames'),
+                pl.col('people_count').max().alias('max_people'),
+                pl.col('threat_level').max().alias('max_threat'),
+            ).sort('camera_id').collect()
+            return df.to_dicts()
+
+        if kind == 'alerts':
+            if lf is None:
+                return []
+            df = lf.filter(pl.col('alert')).sort('ts', descending=True).head(limit).collect()
+            return df.with_columns(pl.col('ts').dt.to_string('%Y-%m-%dT%H:%M:%S%.3f')).to_dicts()
+
+        if kind == 'hourly':
+            if lf is None:
+                return []
+            df = lf.with_columns(pl.col('ts').dt.truncate('1h').alias('hour')).group_by(
+                ['hour', 'camera_id']
+            ).agg(
+                pl.len().alias('frames'),
+                pl.col('alert').sum().alias('alerts'),
+                (pl.col('weapon_count') > 0).sum().alias('weapon_frames'),
+                pl.col('people_count').mean().round(2).alias('avg_people'),
+                pl.col('people_count').max().alias('max_people'),
+            ).sort(['hour', 'camera_id']).collect()
+            return df.with_columns(pl.col('hour').dt.to_string('%Y-%m-%dT%H:00')).to_dicts()
+
+        raise ValueError(f"Unknown query kind '{kind}', expected counts, alerts or hourly")
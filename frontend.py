@@ -10,9 +10,13 @@ import io
 import numpy as np
 import os
 import math
+from protocol import unpack_frame
 
 num_of_cameras = 0  # Placeholder for number of cameras
 
+TILE_SIZE = (400, 300)   # max size of one camera tile
+UI_REFRESH_MS = 66       # fixed repaint rate (~15 fps) no matter how fast frames arrive
+
 class SecuritySystemGUI:
     def __init__(self, root, num_of_cameras):
         self.root = root
@@ -25,8 +29,16 @@ class SecuritySystemGUI:
         self.ws = None
         self.connected = False
         self.cameras_active = False
-        self.current_frames = [None] * num_of_cameras  # support multiple feeds
         self.available_models = []
+
+        # Render pipeline: websocket thread -> decode thread -> fixed-rate Tk repaint.
+        # Each dict only holds the newest frame per camera, so bursts coalesce.
+        self.frame_lock = threading.Lock()
+        self.pending_jpegs = {}  # {cam_id: jpeg bytes} waiting to be decoded
+        self.decoded_tiles = {}  # {cam_id: PIL image} decoded, waiting to be painted
+        self.tile_photos = {}    # {cam_id: PhotoImage} reused with paste()
+        self.decode_event = threading.Event()
+        self.stats_dirty = False
         self.current_model_path = None
         
         # Stats
@@ -34,8 +46,12 @@ class SecuritySystemGUI:
         self.people_count = 0
         self.detected_weapons = []
         self.alert_count = 0
+        self.tile_index = {}  # {camera_id: tile}; ids come from the server's cameras.yml
         
         self.setup_ui()
+
+        threading.Thread(target=self.decode_loop, daemon=True).start()
+        self.root.after(UI_REFRESH_MS, self.render_tick)
     
     def setup_ui(self):
         """Setup the user interface"""
@@ -311,24 +327,21 @@ class SecuritySystemGUI:
         """Connect to WebSocket server"""
         def on_message(ws, message):
             try:
+                if isinstance(message, bytes):
+                    # Binary frame: fixed header + detections payload + raw JPEG
+                    frame = unpack_frame(message)
+                    self.handle_frame(frame['camera_id'], frame['jpeg'], frame['payload']['detections'])
+                    return
+
                 data = json.loads(message)
                 
                 if data['type'] == 'frame':
                     cam_id = data.get('camera_id', 0)
                     img_bytes = base64.b64decode(data['frame'])
-                    img = Image.open(io.BytesIO(img_bytes))
-                    self.current_frames[cam_id] = img  # store per camera
-                    
-                    # Update detections (for global stats)
-                    detections = data['detections']
-                    self.threat_level = detections['threat_level']
-                    self.people_count = detections['people_count']
-                    self.detected_weapons = detections['weapons']
+                    self.handle_frame(cam_id, img_bytes, data['detections'])
 
-                    if len(detections['weapons']) > 0:
-                        self.alert_count += 1
-
-                    self.root.after(0, self.update_display)
+                if data['type'] == 'detections':
+                    self.handle_frame(data.get('camera_id', 0), None, data['detections'])
                     
                 if data['type'] == 'camera_list':
                     cameras = data.get('cameras', [])
@@ -338,11 +351,27 @@ class SecuritySystemGUI:
                 if data['type'] == 'innit':
                     global num_of_cameras
                     num_of_cameras = data['cameras']
+                    camera_ids = data.get('camera_ids', list(range(num_of_cameras)))
+                    self.tile_index = {cam_id: i for i, cam_id in enumerate(camera_ids)}
                     # Handle available models
                     available_models = data.get('available_models', [])
                     current_model = data.get('current_model', '')
                     self.root.after(0, lambda: self.update_model_list(available_models, current_model))
                 
+                if data['type'] == 'events' and data.get('kind') == 'counts':
+                    # Today's alerts from the server's event store, so the counter survives restarts
+                    self.alert_count = sum(row['alerts'] for row in data.get('rows', []))
+                    self.stats_dirty = True
+
+                if data['type'] == 'camera_stopped':
+                    print(f"Camera {data['camera_id']} stopped ({data.get('reason')}): {data.get('source')}")
+
+                if data['type'] == 'model_loading':
+                    message = data.get('message', 'Loading model...')
+                    self.root.after(0, lambda: self.model_status_label.config(
+                        text=f"⏳ {message}", fg='#f59e0b'
+                    ))
+
                 if data['type'] == 'model_switched':
                     model_path = data.get('model_path', '')
                     message = data.get('message', 'Model switched')
@@ -358,9 +387,20 @@ class SecuritySystemGUI:
             self.connected = True
             self.root.after(0, self.update_connection_status)
 
-            # Send init command
-            init_msg = json.dumps({"command": "innit"})
+            # Send init command, asking for binary frames (no base64 overhead)
+            init_msg = json.dumps({"command": "innit", "binary_frames": True})
             ws.send(init_msg)
+
+            # Only ask for what the tiles can show; the server encodes this size once for us
+            ws.send(json.dumps({
+                "command": "subscribe",
+                "max_width": 400,
+                "max_height": 300,
+                "jpeg_quality": 75
+            }))
+
+            # Alerts so far today (defaults to midnight until now)
+            ws.send(json.dumps({"command": "query_events", "kind": "counts"}))
         
         def on_close(ws, close_status_code, close_msg):
             self.connected = False
@@ -383,6 +423,49 @@ class SecuritySystemGUI:
         thread = threading.Thread(target=run_ws, daemon=True)
         thread.start()
     
+    def handle_frame(self, cam_id, img_bytes, detections):
+        """Store a decoded camera frame and its detections, then schedule a repaint"""
+        if img_bytes:  # empty for detections-only messages
+            with self.frame_lock:
+                self.pending_jpegs[cam_id] = bytes(img_bytes)  # replaces any undecoded frame
+            self.decode_event.set()
+
+        # Update detections (for global stats)
+        self.threat_level = detections['threat_level']
+        self.people_count = detections['people_count']
+        self.detected_weapons = detections['weapons']
+
+        if detections.get('alert'):  # set once per alert, not on every frame with a weapon
+            self.alert_count += 1
+        self.stats_dirty = True
+
+    def decode_loop(self):
+        """Decode JPEGs at tile size off the Tk thread"""
+        while True:
+            self.decode_event.wait()
+            self.decode_event.clear()
+            with self.frame_lock:
+                jobs, self.pending_jpegs = self.pending_jpegs, {}
+            for cam_id, data in jobs.items():
+                try:
+                    img = Image.open(io.BytesIO(data))
+                    # Let libjpeg decode at a reduced scale instead of full resolution
+                    img.draft('RGB', TILE_SIZE)
+                    img = img.convert('RGB')
+                    img.thumbnail(TILE_SIZE, Image.Resampling.BILINEAR)
+                except Exception as e:
+                    print(f"Decode error on camera {cam_id}: {e}")
+                    continue
+                with self.frame_lock:
+                    self.decoded_tiles[cam_id] = img
+
+    def render_tick(self):
+        """Fixed-rate repaint: only tiles that changed, reusing PhotoImage buffers"""
+        try:
+            self.update_display()
+        finally:
+            self.root.after(UI_REFRESH_MS, self.render_tick)
+
     def start_cameras(self):
         """Send start cameras command"""
         if self.ws and self.connected:
@@ -500,14 +583,25 @@ class SecuritySystemGUI:
             self.status_label.config(text="INACTIVE")
     
     def update_display(self):
-        """Update all camera feeds and stats"""
-        for i, frame in enumerate(self.current_frames):
-            if frame is not None:
-                display_img = frame.copy()
-                display_img.thumbnail((400, 300), Image.Resampling.LANCZOS)
-                photo = ImageTk.PhotoImage(display_img)
-                self.video_labels[i].config(image=photo, text=f"Camera {i+1}")
+        """Update changed camera feeds and, if anything new arrived, the stats"""
+        with self.frame_lock:
+            tiles, self.decoded_tiles = self.decoded_tiles, {}
+        for cam_id, img in tiles.items():
+            i = self.tile_index.get(cam_id, cam_id)
+            if i >= len(self.video_labels):
+                continue
+            photo = self.tile_photos.get(i)
+            if photo is not None and (photo.width(), photo.height()) == img.size:
+                photo.paste(img)  # reuse the existing Tk image buffer
+            else:
+                photo = ImageTk.PhotoImage(img)
+                self.tile_photos[i] = photo
+                self.video_labels[i].config(image=photo, text=f"Camera {cam_id+1}")
                 self.video_labels[i].image = photo
+
+        if not self.stats_dirty:
+            return
+        self.stats_dirty = False
         
         # Update threat level
         self.threat_label.config(text=f"{self.threat_level}/10")
@@ -549,6 +643,7 @@ class SecuritySystemGUI:
         """Recreate grid if number of active cameras changed"""
         for widget in self.video_grid.winfo_children():
             widget.destroy()
+        self.tile_photos.clear()
         self.num_of_cameras = new_count
         self.create_camera_grid()
 
@@ -0,0 +1,171 @@
+"""
+Cross-camera batched inference scheduler.
+
+Each camera loop submits its newest frame and awaits the result. The
+scheduler gathers pending frames from all active cameras and runs them
+through the model as a single batch, flushing when the batch is full,
+when every active camera has submitted, or when the max-wait deadline
+expires, whichever comes first. Cameras with different model-call options
+(thresholds, class filters) share the wait but go through the model in
+separate calls, one per distinct set of options. Up to max_in_flight
+batches run at once (one per inference worker process); while all are
+busy, new frames wait and the next batch is collected as soon as one ends.
+"""
+
+import asyncio
+import inspect
+import logging
+
+
+class InferenceScheduler:
+    def __init__(self, infer_batch, max_batch_size=8, max_wait=0.02, expected_cameras=None, max_in_flight=1):
+        """
+        Args:
+            infer_batch (callable): Takes a list of frames and their shared options and returns
+                one result per frame. May be a coroutine function, e.g. one that offloads to
+                an executor.
+            max_batch_size (int): Largest number of frames sent to the model at once
+            max_wait (float): Seconds to wait for more frames after the first arrives
+            expected_cameras (callable): Returns how many cameras are currently active,
+                used to flush early once every camera has submitted
+            max_in_flight (int): Batches allowed to run concurrently
+        """
+        self.infer_batch = infer_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.expected_cameras = expected_cameras or (lambda: max_batch_size)
+        self.max_in_flight = max(1, max_in_flight)
+        self._in_flight = set()
+
+        self._pending = {}  # {camera_id: (frame, future, options)}
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+        # Stats
+        self.batches_run = 0
+        self.frames_run = 0
+        self.frames_superseded = 0
+
+    def start(self):
+        """Start the scheduler loop on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    def stop(self):
+        """Cancel the scheduler loop and fail any waiting cameras"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for _, future, _ in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+
+    async def submit(self, camera_id, frame, options=None):
+        """Queue a frame for inference and wait for its result.
+
+        Only the newest frame per camera is kept: if a camera submits again
+        before its previous frame was batched, the older request resolves
+        to None and the caller should skip it.
+
+        Args:
+            options: Hashable model-call options passed to infer_batch (None = defaults)
+        """
+        future = asyncio.get_running_loop().create_future()
+        previous = self._pending.pop(camera_id, None)
+        if previous is not None and not previous[1].done():
+            previous[1].set_result(None)
+            self.frames_superseded += 1
+        self._pending[camera_id] = (frame, future, options)
+        self._wakeup.set()
+        return await future
+
+    def _ready(self):
+        """True once the batch should be flushed without waiting further"""
+        pending = len(self._pending)
+        return pending >= self.max_batch_size or pending >= max(1, self.expected_cameras())
+
+    async def _collect(self):
+        """Wait for the first frame, then until the batch fills or the deadline passes"""
+        while not self._pending:
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while not self._ready():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+
+        batch = []
+        for camera_id in list(self._pending)[:self.max_batch_size]:
+            frame, future, options = self._pending.pop(camera_id)
+            if not future.cancelled():
+                batch.append((camera_id, frame, future, options))
+        return batch
+
+    async def run(self):
+        """Scheduler loop: collect a batch whenever a slot is free and run it in the background"""
+        slots = asyncio.Semaphore(self.max_in_flight)
+        try:
+            while True:
+                await slots.acquire()
+                batch = await self._collect()
+                if not batch:
+                    slots.release()
+                    continue
+                task = asyncio.create_task(self._run_batch(batch))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+                task.add_done_callback(lambda _: slots.release())
+        finally:
+            for task in list(self._in_flight):
+                task.cancel()
+
+    async def _run_batch(self, batch):
+        """Run one collected batch, one model call per options group, and route results back"""
+        groups = {}
+        for _, frame, future, options in batch:
+            groups.setdefault(options, []).append((frame, future))
+
+        for options, group in groups.items():
+            frames = [frame for frame, _ in group]
+            try:
+                results = self.infer_batch(frames, options)
+                if inspect.isawaitable(results):
+                    results = await results
+            except asyncio.CancelledError:
+                # Scheduler stopped: don't leave cameras waiting on this batch
+                for _, _, future, _ in batch:
+                    future.cancel()
+                raise
+            except Exception as e:
+                logging.error(f"Batched inference failed for {len(frames)} frame(s): {e}")
+                for _, future in group:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches_run += 1
+            self.frames_run += len(frames)
+            for (_, future), result in zip(group, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        """Return scheduler counters for reporting"""
+        return {
+            'batches_run': self.batches_run,
+            'frames_run': self.frames_run,
+            'frames_superseded': self.frames_superseded,
+            'avg_batch_size': (self.frames_run / self.batches_run) if self.batches_run else 0.0,
+            'pending': len(self._pending),
+            'in_flight': len(self._in_flight),
+        }
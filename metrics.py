@@ -0,0 +1,184 @@
+"""
+Lightweight pipeline metrics in the Prometheus text format.
+
+Counters and fixed-bucket histograms are plain dicts keyed by label values,
+so recording a sample is a dict lookup, a bisect and two additions - cheap
+enough to leave on for every frame. Gauges are usually callbacks that read
+queue depths and lag from the objects that own them at scrape time.
+
+Samples are recorded from the event loop thread; the rare cross-thread
+observe() may race with a scrape, which at worst shows a sample one scrape
+late.
+"""
+
+import bisect
+import math
+
+# Seconds; spans a fast encode (~1 ms) up to a badly stalled stage
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _label_text(labelnames, values, extra=None):
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self._values.items():
+            yield self.name, labels, None, value
+
+    def snapshot(self):
+        return [{'labels': dict(zip(self.labelnames, k)), 'value': v} for k, v in self._values.items()]
+
+
+class Gauge:
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), collect=None):
+        """
+        Args:
+            collect: Optional callable returning {label_values_tuple: value}, read at scrape time
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+        self._values = {}
+
+    def set(self, value, *labels):
+        self._values[labels] = value
+
+    def _current(self):
+        if self.collect is None:
+            return self._values
+        try:
+            return self.collect()
+        except Exception:
+            # Owners come and go (cameras stopping, clients leaving) while we read them
+            return {}
+
+    def samples(self):
+        for labels, value in self._current().items():
+            yield self.name, labels, None, value
+
+    def snapshot(self):
+        return [{'labels': dict(zip(self.labelnames, k)), 'value': v} for k, v in self._current().items()]
+
+
+class CallbackCounter(Gauge):
+    """A counter whose running total lives on another object (e.g. a capture buffer)"""
+    kind = 'counter'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # {labels: [bucket_counts..., +Inf count, sum]}
+
+    def observe(self, value, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                yield self.name + '_bucket', labels, f'le="{_number(bound)}"', cumulative
+            yield self.name + '_sum', labels, None, series[-1]
+            yield self.name + '_count', labels, None, cumulative
+
+    def quantile(self, labels, q):
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        series = self._series.get(labels)
+        if not series:
+            return None
+        counts = series[:-1]
+        total = sum(counts)
+        if total == 0:
+            return None
+        rank = q * total
+        cumulative = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets + (self.buckets[-1],), counts):
+            if cumulative + count >= rank and count > 0:
+                return lower + (bound - lower) * (rank - cumulative) / count
+            cumulative += count
+            lower = bound
+        return self.buckets[-1]
+
+    def snapshot(self):
+        result = []
+        for labels, series in self._series.items():
+            count = sum(series[:-1])
+            result.append({
+                'labels': dict(zip(self.labelnames, labels)),
+                'count': count,
+                'mean_ms': round(series[-1] / count * 1000, 2) if count else None,
+                'p50_ms': round(self.quantile(labels, 0.5) * 1000, 2),
+                'p99_ms': round(self.quantile(labels, 0.99) * 1000, 2),
+            })
+        return result
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), collect=None):
+        return self.register(Gauge(name, documentation, labelnames, collect))
+
+    def callback_counter(self, name, documentation, labelnames, collect):
+        return self.register(CallbackCounter(name, documentation, labelnames, collect))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Everything in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, extra, value in metric.samples():
+                lines.append(f"{name}{_label_text(metric.labelnames, labels, extra)} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """Everything as JSON-ready data, with histogram percentiles, for the websocket command"""
+        return {metric.name: metric.snapshot() for metric in self._metrics}
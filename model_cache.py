@@ -0,0 +1,80 @@
+"""
+Bounded LRU cache of loaded, warmed-up models.
+
+Switching back to a recently used model is instant because it is still in
+memory and has already run a warmup inference. The cache is bounded both by
+model count and by an estimate of the memory the models hold; the least
+recently used models are evicted first.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+
+def estimate_model_bytes(loaded_model, weights_path):
+    """Approximate memory held by a model: parameter bytes for PyTorch, file size for exports"""
+    try:
+        params = loaded_model.model.parameters()
+        return sum(p.numel() * p.element_size() for p in params)
+    except (AttributeError, TypeError):
+        path = Path(weights_path)
+        if path.is_dir():
+            return sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+        return path.stat().st_size if path.exists() else 0
+
+
+def warm_up(loaded_model, imgsz=640):
+    """Run one dummy inference so the first real frame doesn't pay setup costs"""
+    loaded_model(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), verbose=False)
+
+
+class ModelCache:
+    def __init__(self, max_models=4, max_bytes=1024 * 1024 * 1024):
+        """
+        Args:
+            max_models (int): Most models kept in memory at once
+            max_bytes (int): Memory budget for all cached models combined
+        """
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._models = OrderedDict()  # {(path, runtime): (model, size_bytes)}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a cached model and mark it most recently used, or None"""
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is None:
+                return None
+            self._models.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, loaded_model, size_bytes):
+        """Add a model as most recently used, evicting old ones to stay within budget"""
+        with self._lock:
+            self._models[key] = (loaded_model, size_bytes)
+            self._models.move_to_end(key)
+            while len(self._models) > 1 and (
+                len(self._models) > self.max_models or self.total_bytes() > self.max_bytes
+            ):
+                evicted, _ = self._models.popitem(last=False)
+                logging.info(f"🗑️ Evicted model from cache: {evicted[0]} ({evicted[1]})")
+
+    def total_bytes(self):
+        return sum(size for _, size in self._models.values())
+
+    def stats(self):
+        """Cached models, most recent last"""
+        with self._lock:
+            return {
+                'models': [
+                    {'path': str(path), 'runtime': runtime, 'mb': round(size / 1e6, 1)}
+                    for (path, runtime), (_, size) in self._models.items()
+                ],
+                'total_mb': round(self.total_bytes() / 1e6, 1),
+                'max_mb': round(self.max_bytes / 1e6, 1),
+            }
@@ -0,0 +1,74 @@
+"""
+Cheap motion detection used to skip YOLO on static scenes.
+
+Frames are shrunk to a small greyscale copy, blurred, and compared against
+a running-average background. The motion score is the fraction of watched
+pixels that changed by more than pixel_threshold.
+"""
+
+import cv2
+import numpy as np
+
+
+class MotionDetector:
+    def __init__(self, threshold=0.005, pixel_threshold=25, downscale_width=160,
+                 learning_rate=0.05, mask=None, **_):
+        """
+        Args:
+            threshold (float): Fraction of watched pixels that must change to count as motion
+            pixel_threshold (int): Grey-level difference for a single pixel to count as changed
+            downscale_width (int): Width of the greyscale copy motion runs on
+            learning_rate (float): Background adaptation rate for cv2.accumulateWeighted
+            mask (list): Polygons in normalized (0-1) coordinates to watch; empty = whole frame
+        """
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.downscale_width = downscale_width
+        self.learning_rate = learning_rate
+        self.polygons = mask or []
+
+        self._background = None
+        self._mask = None
+        self._mask_area = 0
+        self.last_score = 0.0
+
+    def _prepare(self, frame):
+        """Downscale, convert to grey and blur"""
+        h, w = frame.shape[:2]
+        scale = self.downscale_width / float(w)
+        small = cv2.resize(frame, (self.downscale_width, max(1, int(h * scale))),
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def _build_mask(self, shape):
+        """Rasterize the watch polygons at the downscaled size"""
+        h, w = shape
+        if not self.polygons:
+            self._mask = None
+            self._mask_area = h * w
+            return
+        mask = np.zeros((h, w), dtype=np.uint8)
+        for polygon in self.polygons:
+            points = np.array([[x * w, y * h] for x, y in polygon], dtype=np.int32)
+            cv2.fillPoly(mask, [points], 255)
+        self._mask = mask
+        self._mask_area = max(1, cv2.countNonZero(mask))
+
+    def update(self, frame):
+        """Feed a frame and return True if it differs enough from the background"""
+        gray = self._prepare(frame)
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.astype(np.float32)
+            self._build_mask(gray.shape)
+            self.last_score = 1.0
+            return True
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        _, changed = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+        if self._mask is not None:
+            changed = cv2.bitwise_and(changed, self._mask)
+        self.last_score = cv2.countNonZero(changed) / self._mask_area
+
+        cv2.accumulateWeighted(gray, self._background, self.learning_rate)
+        return self.last_score >= self.threshold
@@ -0,0 +1,313 @@
+"""
+Pipeline stages that can run in a worker thread or worker process.
+
+Everything here is importable without side effects (no model is loaded at
+import time), so a ProcessPoolExecutor can pickle these functions by name
+on every platform, including Windows where workers are spawned fresh.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+from runtimes import load_model
+from model_cache import warm_up
+from encoders import get_encoder
+
+WEAPON_CLASSES = {43: 'Knife', 34: 'Baseball Bat', 76: 'Scissors'}
+WEAPON_CLASS_IDS = np.array(list(WEAPON_CLASSES), dtype=np.int64)
+
+# Models owned by this worker process (process execution mode only), least recently used
+# first: {(model_path, runtime): model}. Room for the main model, the cascade's weapon model
+# and the previous main model, so switching back doesn't reload from disk.
+_WORKER_MODELS = OrderedDict()
+WORKER_MODEL_SLOTS = int(os.environ.get("WORKER_MODEL_SLOTS", "3"))
+_PRELOADS = {}        # {(model_path, runtime): Thread} background loads in this worker
+_PRELOAD_ERRORS = {}  # {(model_path, runtime): exception} from a failed background load
+
+# Unknown class-filter names already warned about, so a bad filter logs once, not every batch
+_WARNED_CLASSES = set()
+
+# Per-thread scratch arrays for drawing and resizing, reused while the frame size stays the same
+_BUFFERS = threading.local()
+
+
+def _scratch(key, shape):
+    """A uint8 array of this shape owned by the calling thread"""
+    arrays = getattr(_BUFFERS, 'arrays', None)
+    if arrays is None:
+        arrays = _BUFFERS.arrays = {}
+    buffer = arrays.get(key)
+    if buffer is None or buffer.shape != shape:
+        buffer = arrays[key] = np.empty(shape, dtype=np.uint8)
+    return buffer
+
+
+def encode_jpeg(frame, quality=85):
+    """Encode frame to raw JPEG bytes with this process's encoder (see encoders.py)"""
+    return get_encoder()(frame, int(quality))
+
+
+def predict_options(settings):
+    """Hashable model-call options from a camera's 'detection' settings (None = model defaults).
+    Only what changes the model() call goes in, since the scheduler batches cameras by these;
+    send_objects is applied per camera after inference."""
+    classes = settings.get('classes')
+    options = (
+        ('classes', tuple(classes) if classes is not None else None),
+        ('conf', settings.get('conf')),
+        ('iou', settings.get('iou')),
+        ('max_det', settings.get('max_det')),
+    )
+    return None if all(value is None for _, value in options) else options
+
+
+def predict_kwargs(model, options):
+    """model() keyword arguments from predict_options().
+    Class names in the allow-list are resolved against this model's own names."""
+    if options is None:
+        return {}
+    kwargs = {key: value for key, value in options if value is not None}
+    if 'classes' in kwargs:
+        ids = {name.lower(): i for i, name in model.names.items()}
+        wanted = kwargs['classes']
+        unknown = [c for c in wanted if not isinstance(c, int) and c.lower() not in ids]
+        classes = sorted({c if isinstance(c, int) else ids[c.lower()] for c in wanted if c not in unknown})
+        if unknown and wanted not in _WARNED_CLASSES:
+            _WARNED_CLASSES.add(wanted)
+            if classes:
+                logging.warning(f"Class filter names not in this model, ignored: {unknown}")
+            else:
+                logging.warning(f"No class in filter {list(wanted)} is known to this model, detecting all classes")
+        if classes:
+            kwargs['classes'] = classes
+        else:
+            # An empty list would silently return nothing at all
+            del kwargs['classes']
+    return kwargs
+
+
+def parse_detections(result):
+    """Split one YOLO result into people, weapons and other objects.
+
+    Boxes are pulled to the host as one (N, 6) array in a single transfer and
+    split with NumPy masks, instead of converting each box separately.
+    """
+    detections = {
+        'people': [],
+        'weapons': [],
+        'objects': [],
+        'people_count': 0,
+        'threat_level': 0,
+        'alert': None
+    }
+
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return detections
+
+    # Columns: x1, y1, x2, y2, [track_id,] conf, cls
+    data = boxes.data.cpu().numpy()
+    xyxy = data[:, :4]
+    conf = data[:, -2]
+    cls = data[:, -1].astype(np.int64)
+
+    person_mask = cls == 0
+    weapon_mask = np.isin(cls, WEAPON_CLASS_IDS)
+    object_mask = ~(person_mask | weapon_mask)
+
+    detections['people'] = [
+        {'bbox': bbox, 'confidence': c}
+        for bbox, c in zip(xyxy[person_mask].tolist(), conf[person_mask].tolist())
+    ]
+    detections['people_count'] = len(detections['people'])
+
+    detections['weapons'] = [
+        {'name': WEAPON_CLASSES[k], 'confidence': c, 'bbox': bbox}
+        for bbox, c, k in zip(xyxy[weapon_mask].tolist(), conf[weapon_mask].tolist(),
+                              cls[weapon_mask].tolist())
+    ]
+
+    names = result.names
+    detections['objects'] = [
+        {'name': names[k], 'confidence': c, 'bbox': bbox}
+        for bbox, c, k in zip(xyxy[object_mask].tolist(), conf[object_mask].tolist(),
+                              cls[object_mask].tolist())
+    ]
+
+    return detections
+
+
+def draw_detections(frame, detections, camera_id=None):
+    """Draw bounding boxes on frame"""
+    for person in detections['people']:
+        x1, y1, x2, y2 = map(int, person['bbox'])
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        track = f" #{person['track_id']}" if 'track_id' in person else ""
+        label = f"Person{track} {person['confidence']:.2f}"
+        cv2.putText(frame, label, (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+
+    for weapon in detections['weapons']:
+        x1, y1, x2, y2 = map(int, weapon['bbox'])
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 3)
+        label = f"{weapon['name']} {weapon['confidence']:.2f}"
+        cv2.putText(frame, label, (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+        
+    # Annotate camera ID on bottom-right
+    if camera_id is not None:
+        h, w = frame.shape[:2]
+        text = f"Camera {camera_id}"
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        scale = 1
+        thickness = 2
+        color = (255, 255, 255)  # white
+        text_size = cv2.getTextSize(text, font, scale, thickness)[0]
+        position = (w - text_size[0] - 10, h - 10)
+        cv2.putText(frame, text, position, font, scale, color, thickness)
+    return frame
+
+
+def fit_within(frame, max_width, max_height, reuse=False):
+    """Downscale to fit max_width x max_height, keeping aspect ratio (never upscales).
+    With reuse=True the result lands in a per-thread buffer that the next call may overwrite."""
+    h, w = frame.shape[:2]
+    scale = min(
+        (max_width / w) if max_width else 1.0,
+        (max_height / h) if max_height else 1.0,
+        1.0
+    )
+    if scale >= 1.0:
+        return frame
+    size = (max(1, int(w * scale)), max(1, int(h * scale)))
+    if reuse:
+        out = _scratch(('resize',) + size, (size[1], size[0]) + frame.shape[2:])
+        return cv2.resize(frame, size, dst=out, interpolation=cv2.INTER_AREA)
+    return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+
+def render_frame(frame, detections, camera_id=None, variants=((None, None, 85),), qualities=None):
+    """Draw detections once, then encode one JPEG per requested (max_width, max_height, quality).
+
+    Args:
+        qualities (dict): Optional {variant: quality} overriding each variant's own quality
+            (adaptive quality, see encoders.AdaptiveQuality)
+
+    Returns:
+        dict: {variant: jpeg_bytes}
+    """
+    # Draw on a reused per-thread copy instead of allocating a new frame every time
+    canvas = _scratch('canvas', frame.shape)
+    np.copyto(canvas, frame)
+    frame_with_detections = draw_detections(canvas, detections, camera_id)
+    encoded = {}
+    for variant in variants:
+        max_width, max_height, quality = variant
+        if qualities is not None:
+            quality = qualities.get(variant, quality)
+        resized = fit_within(frame_with_detections, max_width, max_height, reuse=True)
+        encoded[variant] = encode_jpeg(resized, quality)
+    return encoded
+
+
+def _cache_worker_model(key, worker_model):
+    _WORKER_MODELS[key] = worker_model
+    _WORKER_MODELS.move_to_end(key)
+    while len(_WORKER_MODELS) > WORKER_MODEL_SLOTS:
+        _WORKER_MODELS.popitem(last=False)
+
+
+def _load_and_warm(model_path, runtime, device):
+    worker_model = load_model(model_path, runtime, device)
+    warm_up(worker_model)
+    return worker_model
+
+
+def load_worker_model(model_path, runtime, device):
+    """This worker's own warmed copy of a model, loaded on first use and kept in a small LRU"""
+    key = (model_path, runtime)
+    preload = _PRELOADS.get(key)
+    if preload is not None:
+        # Already loading in the background; wait for it rather than load it twice
+        preload.join()
+    worker_model = _WORKER_MODELS.get(key)
+    if worker_model is not None:
+        _WORKER_MODELS.move_to_end(key)
+        return worker_model
+    worker_model = _load_and_warm(model_path, runtime, device)
+    _cache_worker_model(key, worker_model)
+    return worker_model
+
+
+def _preload(key, model_path, runtime, device):
+    try:
+        _cache_worker_model(key, _load_and_warm(model_path, runtime, device))
+    except Exception as e:
+        _PRELOAD_ERRORS[key] = e
+    finally:
+        _PRELOADS.pop(key, None)
+
+
+def start_worker_preload(model_path, runtime, device):
+    """Start loading a model on a background thread of this worker and return at once.
+
+    The worker keeps serving batches on its current model meanwhile. Returns
+    (pid, ready); the backend calls it repeatedly until every worker is ready,
+    and a failed background load is raised on the next call.
+    """
+    key = (model_path, runtime)
+    error = _PRELOAD_ERRORS.pop(key, None)
+    if error is not None:
+        raise error
+    if key in _WORKER_MODELS:
+        return os.getpid(), True
+    if key not in _PRELOADS:
+        thread = _PRELOADS[key] = threading.Thread(
+            target=_preload, args=(key, model_path, runtime, device), name="model-preload", daemon=True
+        )
+        thread.start()
+    return os.getpid(), False
+
+
+def infer_frames(model_path, runtime, device, frames, options=None):
+    """Run a batch in a worker process and return parsed detections per frame.
+
+    The backend preloads a new model in every worker before switching to it
+    (see start_worker_preload); a worker that missed it loads on its next batch.
+    """
+    worker_model = load_worker_model(model_path, runtime, device)
+    kwargs = predict_kwargs(worker_model, options)
+    return [parse_detections(r) for r in worker_model(frames, verbose=False, **kwargs)]
+
+
+def parse_weapons(result, weapon_names):
+    """Weapon boxes from a model whose class names are in weapon_names (lower case)"""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return []
+    data = boxes.data.cpu().numpy()
+    names = result.names
+    weapons = []
+    for row in data:
+        name = names[int(row[-1])]
+        if name.lower() in weapon_names:
+            weapons.append({
+                'name': name.title(),
+                'confidence': float(row[-2]),
+                'bbox': row[:4].tolist()
+            })
+    return weapons
+
+
+def detect_weapons(model, crops, imgsz, conf, weapon_names):
+    """Run the cascade's weapon model on a batch of equally sized padded crops"""
+    return [parse_weapons(r, weapon_names) for r in model(crops, imgsz=imgsz, conf=conf, verbose=False)]
+
+
+def infer_weapon_crops(model_path, runtime, device, crops, imgsz, conf, weapon_names):
+    """detect_weapons in a worker process, with the worker's own copy of the weapon model"""
+    worker_model = load_worker_model(model_path, runtime, device)
+    return detect_weapons(worker_model, crops, imgsz, conf, weapon_names)
@@ -0,0 +1,149 @@
+"""
+On-demand sampling profiler for the running backend.
+
+A profiling session samples the stack of every Python thread (the event
+loop, capture threads, executor workers, writers) with sys._current_frames()
+at a fixed interval from its own thread, so nothing in the pipeline has to
+stop or cooperate. Pipeline stages also report spans while a session is
+active. A session writes three files to profiles/:
+
+    profile_<stamp>.folded      collapsed stacks, for flamegraph.pl or speedscope
+    profile_<stamp>.trace.json  stage spans in Chrome trace format (Perfetto, chrome://tracing)
+    profile_<stamp>.json        summary with the hottest functions
+
+Process-pool workers (EXECUTION_MODE=process) are separate processes and
+only show up as the parent thread waiting on them.
+"""
+
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+
+def _label(code, cache):
+    label = cache.get(code)
+    if label is None:
+        label = cache[code] = f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+    return label
+
+
+class SamplingProfiler:
+    def __init__(self, output_dir='profiles', max_spans=200000):
+        """
+        Args:
+            output_dir (str): Where session files are written
+            max_spans (int): Stage spans kept per session; later ones are counted but not stored
+        """
+        self.output_dir = Path(output_dir)
+        self.max_spans = max_spans
+        self._lock = threading.Lock()
+        self.active = False
+        self._spans = []
+        self._spans_dropped = 0
+        self._started_perf = 0.0
+
+    def add_span(self, name, category, start, duration):
+        """Record one stage span (perf_counter start, seconds) if a session is running"""
+        if not self.active:
+            return
+        if len(self._spans) >= self.max_spans:
+            self._spans_dropped += 1
+            return
+        self._spans.append((name, str(category), start, duration, threading.get_ident()))
+
+    def run(self, seconds=10.0, interval=0.005):
+        """Profile for `seconds`, blocking the calling thread, and write the results.
+
+        Returns:
+            dict: Output paths and the hot-function summary
+        """
+        with self._lock:
+            if self.active:
+                raise RuntimeError("A profiling session is already running")
+            self._spans = []
+            self._spans_dropped = 0
+            self._started_perf = time.perf_counter()
+            self.active = True
+
+        own_id = threading.get_ident()
+        stacks = Counter()
+        self_samples = Counter()
+        total_samples = Counter()
+        labels = {}
+        samples = 0
+        deadline = time.perf_counter() + seconds
+        try:
+            while time.perf_counter() < deadline:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_label(frame.f_code, labels))
+                        frame = frame.f_back
+                    if not stack:
+                        continue
+                    stack.reverse()
+                    stacks[names.get(thread_id, str(thread_id)) + ';' + ';'.join(stack)] += 1
+                    self_samples[stack[-1]] += 1
+                    for function in set(stack):
+                        total_samples[function] += 1
+                samples += 1
+                time.sleep(interval)
+        finally:
+            self.active = False
+
+        elapsed = time.perf_counter() - self._started_perf
+        return self._write(stacks, self_samples, total_samples, samples, elapsed, interval)
+
+    def _write(self, stacks, self_samples, total_samples, samples, elapsed, interval):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stem = self.output_dir / f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        folded_path = stem.with_suffix('.folded')
+        trace_path = stem.with_suffix('.trace.json')
+        summary_path = stem.with_suffix('.json')
+
+        with open(folded_path, 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        events = [
+            {
+                'name': name, 'cat': category, 'ph': 'X', 'pid': 0, 'tid': thread_id,
+                'ts': round((start - self._started_perf) * 1e6, 1), 'dur': round(duration * 1e6, 1),
+            }
+            for name, category, start, duration, thread_id in self._spans
+        ]
+        with open(trace_path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+        thread_samples = sum(self_samples.values()) or 1
+        summary = {
+            'seconds': round(elapsed, 2),
+            'interval_ms': round(interval * 1000, 2),
+            'samples': samples,
+            'spans': len(events),
+            'spans_dropped': self._spans_dropped,
+            'top_self': [
+                {'function': fn, 'samples': n, 'percent': round(100 * n / thread_samples, 1)}
+                for fn, n in self_samples.most_common(20)
+            ],
+            'top_total': [
+                {'function': fn, 'samples': n, 'percent': round(100 * n / thread_samples, 1)}
+                for fn, n in total_samples.most_common(20)
+            ],
+            'folded': str(folded_path),
+            'trace': str(trace_path),
+        }
+        with open(summary_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        summary['summary'] = str(summary_path)
+        self._spans = []
+        logging.info(f"🔬 Profile written: {folded_path} ({samples} samples, {len(events)} spans)")
+        return summary
@@ -0,0 +1,61 @@
+"""
+Binary WebSocket frame protocol shared by backend.py and frontend.py.
+
+A binary frame message is:
+
+    header (fixed 22 bytes, big-endian, no padding)
+        magic           2s   b'SF'
+        version         B
+        flags           B    reserved, 0
+        camera_id       H
+        seq             I    capture sequence number
+        timestamp       d    capture time, seconds since the epoch
+        payload_length  I    length of the detection payload in bytes
+    payload             compact UTF-8 JSON ({'detections': ..., ...})
+    jpeg                raw JPEG bytes until the end of the message
+                        (empty for detections-only subscriptions)
+
+Clients opt in by sending {"command": "innit", "binary_frames": true}.
+Clients that don't keep receiving the JSON 'frame' messages with a base64
+JPEG, so old frontends keep working.
+"""
+
+import json
+import struct
+
+MAGIC = b'SF'
+VERSION = 1
+HEADER = struct.Struct('>2sBBHIdI')
+HEADER_SIZE = HEADER.size
+
+
+def pack_frame(camera_id, seq, timestamp, payload, jpeg_bytes):
+    """Build one binary frame message from a payload dict and JPEG bytes"""
+    payload_bytes = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    header = HEADER.pack(MAGIC, VERSION, 0, camera_id, seq, timestamp, len(payload_bytes))
+    return b''.join((header, payload_bytes, bytes(jpeg_bytes)))
+
+
+def unpack_frame(message):
+    """Split a binary frame message into its parts.
+
+    Returns:
+        dict: camera_id, seq, timestamp, payload (dict) and jpeg (memoryview)
+    """
+    if len(message) < HEADER_SIZE:
+        raise ValueError(f"Binary frame too short: {len(message)} bytes")
+    magic, version, _flags, camera_id, seq, timestamp, payload_length = HEADER.unpack_from(message)
+    if magic != MAGIC:
+        raise ValueError(f"Bad binary frame magic: {magic!r}")
+    if version != VERSION:
+        raise ValueError(f"Unsupported binary frame version: {version}")
+
+    view = memoryview(message)
+    payload_end = HEADER_SIZE + payload_length
+    return {
+        'camera_id': camera_id,
+        'seq': seq,
+        'timestamp': timestamp,
+        'payload': json.loads(bytes(view[HEADER_SIZE:payload_end])),
+        'jpeg': view[payload_end:],
+    }
@@ -0,0 +1,79 @@
+"""
+Adaptive per-camera inference rate.
+
+Each camera decides how often to run YOLO from its threat state, recent
+motion and how much CPU the machine has left. Cameras with an active
+weapon alert always get the full rate; quiet cameras drop to idle_fps.
+Video keeps flowing to clients in between, reusing the last detections.
+"""
+
+import time
+
+import psutil
+
+_CPU_SAMPLE_INTERVAL = 1.0
+_cpu_percent = 0.0
+_cpu_sampled_at = 0.0
+
+
+def cpu_percent():
+    """System-wide CPU use, sampled at most once per second and shared by all cameras"""
+    global _cpu_percent, _cpu_sampled_at
+    now = time.monotonic()
+    if now - _cpu_sampled_at >= _CPU_SAMPLE_INTERVAL:
+        # interval=None compares against the previous call, so it never blocks
+        _cpu_percent = psutil.cpu_percent(interval=None)
+        _cpu_sampled_at = now
+    return _cpu_percent
+
+
+class InferenceRateController:
+    def __init__(self, enabled=True, max_fps=15.0, active_fps=8.0, idle_fps=2.0,
+                 cpu_high=85.0, cpu_low=60.0, **_):
+        """
+        Args:
+            enabled (bool): When False, every frame is inferred (subject to motion gating)
+            max_fps (float): Rate used while a weapon alert is active
+            active_fps (float): Rate when people are present or the scene is moving
+            idle_fps (float): Rate for quiet cameras
+            cpu_high (float): CPU percent above which active cameras are throttled
+            cpu_low (float): CPU percent below which no throttling is applied
+        """
+        self.enabled = enabled
+        self.max_fps = max_fps
+        self.active_fps = active_fps
+        self.idle_fps = idle_fps
+        self.cpu_high = cpu_high
+        self.cpu_low = cpu_low
+        self.current_fps = max_fps
+        self._last_inference = 0.0
+
+    def _cpu_factor(self):
+        """1.0 with plenty of headroom, scaling down linearly to 0.25 at cpu_high and above"""
+        cpu = cpu_percent()
+        if cpu <= self.cpu_low:
+            return 1.0
+        if cpu >= self.cpu_high:
+            return 0.25
+        return 1.0 - 0.75 * (cpu - self.cpu_low) / (self.cpu_high - self.cpu_low)
+
+    def update(self, alert_active, threat_level, moving):
+        """Recompute the target rate for this camera and return it"""
+        if not self.enabled or alert_active:
+            self.current_fps = self.max_fps
+        elif threat_level > 0 or moving:
+            self.current_fps = max(self.idle_fps, self.active_fps * self._cpu_factor())
+        else:
+            self.current_fps = self.idle_fps
+        return self.current_fps
+
+    def due(self, now=None):
+        """True once enough time has passed since the last inference for the current rate"""
+        if not self.enabled:
+            return True
+        now = time.time() if now is None else now
+        return now - self._last_inference >= 1.0 / self.current_fps
+
+    def mark(self, now=None):
+        """Record that an inference just ran"""
+        self._last_inference = time.time() if now is None else now
@@ -0,0 +1,193 @@
+"""
+Event-triggered clip recording with an in-memory pre-roll.
+
+Each camera keeps a ring buffer of already-encoded JPEG frames covering the
+last preroll_seconds, hard-capped at max_buffer_mb. When a weapon alert
+starts, the pre-roll is handed to a background writer thread and recording
+continues until the alert has cleared (after THREAT_DECAY_SECONDS) plus
+postroll_seconds. Decoding and disk writes happen only on the writer
+thread, never on the capture or inference path.
+
+Recording costs one extra render and JPEG encode at the recorded size per
+recorded frame, whatever the clients subscribed to, so frames are taken at
+most fps times a second (pre-roll and clip alike) rather than every frame.
+"""
+
+import logging
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+
+class ClipRecorder:
+    def __init__(self, camera_id, preroll_seconds=10.0, postroll_seconds=5.0, max_buffer_mb=32,
+                 max_width=1280, max_height=720, jpeg_quality=80, fps=5.0, output_dir='recordings',
+                 max_queue_frames=600, **_):
+        """
+        Args:
+            camera_id: Camera this recorder belongs to (used in file names)
+            preroll_seconds (float): Footage kept in memory before an alert
+            postroll_seconds (float): Footage recorded after the alert clears
+            max_buffer_mb (float): Hard cap on memory used by the pre-roll buffer
+            max_width, max_height, jpeg_quality: Encoding of recorded frames
+            fps (float): Recorded frames per second; None records every processed frame
+            output_dir (str): Where clips are written
+            max_queue_frames (int): Frames the writer may fall behind before new ones are dropped
+        """
+        self.camera_id = camera_id
+        self.preroll_seconds = preroll_seconds
+        self.postroll_seconds = postroll_seconds
+        self.max_buffer_bytes = int(max_buffer_mb * 1024 * 1024)
+        self.variant = (max_width, max_height, jpeg_quality)
+        self.fps = fps
+        self._next_due = None
+        self.output_dir = Path(output_dir)
+
+        self._ring = deque()  # (timestamp, jpeg_bytes)
+        self._ring_bytes = 0
+        self._queue = queue.Queue()
+        self.max_queue_frames = max_queue_frames
+        self._thread = None
+
+        self.recording = False
+        self._alert_cleared_at = None
+
+        # Stats
+        self.clips_written = 0
+        self.frames_dropped = 0
+
+    def _push_ring(self, timestamp, jpeg_bytes):
+        """Add to the pre-roll, evicting by age and by the byte cap"""
+        self._ring.append((timestamp, jpeg_bytes))
+        self._ring_bytes += len(jpeg_bytes)
+        while self._ring and (
+            timestamp - self._ring[0][0] > self.preroll_seconds
+            or self._ring_bytes > self.max_buffer_bytes
+        ):
+            _, old = self._ring.popleft()
+            self._ring_bytes -= len(old)
+
+    def _send(self, item):
+        """Hand work to the writer without ever blocking the caller.
+        Frames are dropped if the writer is too far behind; start/stop never are."""
+        if item[0] == 'frame' and self._queue.qsize() >= self.max_queue_frames:
+            self.frames_dropped += 1
+            return
+        self._queue.put_nowait(item)
+
+    def _estimate_fps(self):
+        if len(self._ring) < 2:
+            return 15.0
+        span = self._ring[-1][0] - self._ring[0][0]
+        return max(1.0, min(60.0, (len(self._ring) - 1) / span)) if span > 0 else 15.0
+
+    def wants_frame(self, timestamp, alert_active):
+        """True if this frame should be encoded and passed to add(); paced to fps"""
+        if not self.fps:
+            return True
+        if alert_active and not self.recording:
+            # Start the clip on the alert frame itself
+            self._next_due = timestamp + 1.0 / self.fps
+            return True
+        if self._next_due is not None and timestamp < self._next_due:
+            return False
+        interval = 1.0 / self.fps
+        if self._next_due is None or timestamp - self._next_due > interval:
+            # First frame, or the camera fell behind: restart the schedule from now
+            self._next_due = timestamp + interval
+        else:
+            self._next_due += interval
+        return True
+
+    def add(self, timestamp, jpeg_bytes, alert_active):
+        """Feed one encoded frame and the camera's current alert state"""
+        if not self.recording:
+            self._push_ring(timestamp, jpeg_bytes)
+            if alert_active:
+                self._start_clip(timestamp)
+            return
+
+        self._send(('frame', timestamp, jpeg_bytes))
+        if alert_active:
+            self._alert_cleared_at = None
+        elif self._alert_cleared_at is None:
+            self._alert_cleared_at = timestamp
+        elif timestamp - self._alert_cleared_at >= self.postroll_seconds:
+            self._stop_clip()
+
+    def _start_clip(self, timestamp):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._writer, name=f"recorder-{self.camera_id}", daemon=True
+            )
+            self._thread.start()
+
+        stamp = datetime.fromtimestamp(timestamp).strftime('%Y%m%d_%H%M%S')
+        path = self.output_dir / f"camera{self.camera_id}_{stamp}.avi"
+        self._send(('start', path, self.fps or self._estimate_fps()))
+        for ts, jpeg in self._ring:
+            self._send(('frame', ts, jpeg))
+        self._ring.clear()
+        self._ring_bytes = 0
+
+        self.recording = True
+        self._alert_cleared_at = None
+        logging.info(f"🎥 Camera {self.camera_id} recording started: {path}")
+
+    def _stop_clip(self):
+        self._send(('stop',))
+        self.recording = False
+        self._alert_cleared_at = None
+
+    def close(self):
+        """Finish any clip in progress and stop the writer thread"""
+        if self.recording:
+            self._stop_clip()
+        if self._thread is not None:
+            self._queue.put_nowait(('exit',))
+            self._thread.join(timeout=5)
+
+    def _writer(self):
+        writer = None
+        size = None
+        path = None
+        fps = 15.0
+        while True:
+            item = self._queue.get()
+            kind = item[0]
+            if kind == 'start':
+                _, path, fps = item
+                path.parent.mkdir(parents=True, exist_ok=True)
+            elif kind == 'frame':
+                frame = cv2.imdecode(np.frombuffer(item[2], dtype=np.uint8), cv2.IMREAD_COLOR)
+                if frame is None or path is None:
+                    continue
+                if writer is None:
+                    size = (frame.shape[1], frame.shape[0])
+                    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), fps, size)
+                if (frame.shape[1], frame.shape[0]) != size:
+                    frame = cv2.resize(frame, size)
+                writer.write(frame)
+            elif kind in ('stop', 'exit'):
+                if writer is not None:
+                    writer.release()
+                    self.clips_written += 1
+                    logging.info(f"💾 Camera {self.camera_id} clip saved: {path}")
+                writer = None
+                path = None
+                if kind == 'exit':
+                    return
+
+    def stats(self):
+        return {
+            'recording': self.recording,
+            'preroll_frames': len(self._ring),
+            'preroll_mb': round(self._ring_bytes / 1e6, 2),
+            'clips_written': self.clips_written,
+            'frames_dropped': self.frames_dropped,
+        }
@@ -0,0 +1,198 @@
+"""
+Inference runtimes for YOLO models.
+
+The same .pt weights can run under PyTorch, ONNX Runtime or OpenVINO.
+Non-PyTorch variants are exported on demand with ultralytics and cached
+next to the weights (yolov8n.pt -> yolov8n.onnx, yolov8n_openvino_model/),
+and re-exported when the .pt file is newer than the cached export.
+ONNX Runtime and OpenVINO are optional: a runtime is only offered when its
+Python package is installed.
+
+The '-int8' runtimes are opt-in quantized variants for CPU-only machines.
+Both are calibrated on frames from data/images/val: ONNX with static QDQ
+quantization through onnxruntime (falling back to dynamic quantization if
+there are no calibration images), OpenVINO through ultralytics' NNCF export.
+Use scripts/quantize_model.py to compare accuracy and latency against FP32.
+"""
+
+import importlib.util
+import logging
+from pathlib import Path
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+RUNTIMES = {
+    'pytorch': {
+        'package': 'torch',
+        'export_format': None,
+    },
+    'onnx': {
+        'package': 'onnxruntime',
+        'export_format': 'onnx',
+    },
+    'openvino': {
+        'package': 'openvino',
+        'export_format': 'openvino',
+    },
+    'onnx-int8': {
+        'package': 'onnxruntime',
+        'export_format': 'onnx',
+    },
+    'openvino-int8': {
+        'package': 'openvino',
+        'export_format': 'openvino',
+    },
+}
+
+EXPORT_IMGSZ = 640
+
+# Calibration data for INT8 quantization
+BASE_PATH = Path(__file__).parent
+DATA_YAML = BASE_PATH / "data" / "data.yml"
+CALIBRATION_DIR = BASE_PATH / "data" / "images" / "val"
+CALIBRATION_MAX_IMAGES = 100
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def calibration_images(directory=CALIBRATION_DIR, limit=CALIBRATION_MAX_IMAGES):
+    """Image files used to calibrate INT8 activation ranges"""
+    directory = Path(directory)
+    if not directory.exists():
+        return []
+    return sorted(p for p in directory.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)[:limit]
+
+
+def letterbox(image, size=EXPORT_IMGSZ):
+    """Resize keeping aspect ratio and pad to size x size, matching YOLO preprocessing"""
+    h, w = image.shape[:2]
+    scale = min(size / h, size / w)
+    resized = cv2.resize(image, (int(round(w * scale)), int(round(h * scale))),
+                         interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    top = (size - resized.shape[0]) // 2
+    left = (size - resized.shape[1]) // 2
+    canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    return canvas
+
+
+def preprocess_for_onnx(image):
+    """BGR uint8 image -> 1x3xHxW float32 RGB tensor in [0, 1]"""
+    rgb = cv2.cvtColor(letterbox(image), cv2.COLOR_BGR2RGB)
+    return np.ascontiguousarray(rgb.transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+
+
+def runtime_available(runtime):
+    """True if the runtime is known and its package is installed"""
+    info = RUNTIMES.get(runtime)
+    return info is not None and importlib.util.find_spec(info['package']) is not None
+
+
+def export_path(weights_path, runtime):
+    """Where the cached export for this runtime lives (the .pt itself for pytorch)"""
+    weights_path = Path(weights_path)
+    if runtime == 'onnx':
+        return weights_path.with_suffix('.onnx')
+    if runtime == 'openvino':
+        return weights_path.parent / f"{weights_path.stem}_openvino_model"
+    if runtime == 'onnx-int8':
+        return weights_path.parent / f"{weights_path.stem}_int8.onnx"
+    if runtime == 'openvino-int8':
+        return weights_path.parent / f"{weights_path.stem}_int8_openvino_model"
+    return weights_path
+
+
+def is_exported(weights_path, runtime):
+    """True if a cached export exists and is at least as new as the weights"""
+    target = export_path(weights_path, runtime)
+    if runtime == 'pytorch':
+        return target.exists()
+    return target.exists() and target.stat().st_mtime >= Path(weights_path).stat().st_mtime
+
+
+def ensure_export(weights_path, runtime):
+    """Export the weights for a runtime if there is no fresh cached copy. Returns the model path."""
+    if runtime not in RUNTIMES:
+        raise ValueError(f"Unknown runtime '{runtime}', expected one of {list(RUNTIMES)}")
+    if not runtime_available(runtime):
+        raise RuntimeError(f"Runtime '{runtime}' needs the '{RUNTIMES[runtime]['package']}' package")
+    if runtime == 'pytorch' or is_exported(weights_path, runtime):
+        return export_path(weights_path, runtime)
+
+    logging.info(f"📦 Exporting {weights_path} for {runtime}...")
+    if runtime == 'onnx-int8':
+        exported = quantize_onnx(weights_path, export_path(weights_path, runtime))
+    elif runtime == 'openvino-int8':
+        # NNCF post-training quantization, calibrated on the dataset's val split
+        exported = YOLO(str(weights_path)).export(
+            format='openvino', imgsz=EXPORT_IMGSZ, dynamic=True, int8=True, data=str(DATA_YAML)
+        )
+    else:
+        # Dynamic input shapes so cross-camera batches of any size can run through the export
+        exported = YOLO(str(weights_path)).export(
+            format=RUNTIMES[runtime]['export_format'], imgsz=EXPORT_IMGSZ, dynamic=True
+        )
+    logging.info(f"✅ Exported {runtime} model: {exported}")
+    return Path(exported)
+
+
+def quantize_onnx(weights_path, target):
+    """Quantize the FP32 ONNX export to INT8, statically if calibration images exist"""
+    import onnxruntime
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_dynamic, quantize_static
+    )
+
+    fp32_path = ensure_export(weights_path, 'onnx')
+    images = calibration_images()
+    if not images:
+        logging.warning(f"No calibration images in {CALIBRATION_DIR}, using dynamic INT8 quantization")
+        quantize_dynamic(str(fp32_path), str(target), weight_type=QuantType.QUInt8)
+        return target
+
+    input_name = onnxruntime.InferenceSession(
+        str(fp32_path), providers=['CPUExecutionProvider']
+    ).get_inputs()[0].name
+
+    class ValImageReader(CalibrationDataReader):
+        def __init__(self):
+            self._images = iter(images)
+
+        def get_next(self):
+            for path in self._images:
+                image = cv2.imread(str(path))
+                if image is not None:
+                    return {input_name: preprocess_for_onnx(image)}
+            return None
+
+    logging.info(f"Calibrating INT8 ranges on {len(images)} images from {CALIBRATION_DIR}")
+    quantize_static(
+        str(fp32_path), str(target), ValImageReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True
+    )
+    return target
+
+
+def load_model(weights_path, runtime='pytorch', device='cpu'):
+    """Load weights under the given runtime, exporting first if needed"""
+    path = ensure_export(weights_path, runtime)
+    if runtime == 'pytorch':
+        return YOLO(str(path)).to(device)
+    # Exported models pick their own (CPU) device; .to() only applies to PyTorch
+    return YOLO(str(path), task='detect')
+
+
+def list_runtime_variants(weights_path):
+    """Describe which runtimes a .pt file can run under and which are already exported"""
+    return [
+        {
+            'runtime': runtime,
+            'available': runtime_available(runtime),
+            'exported': is_exported(weights_path, runtime),
+        }
+        for runtime in RUNTIMES
+    ]
@@ -0,0 +1,78 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pipeline_workers import parse_detections, WEAPON_CLASSES
+
+
+def parse_detections_per_box(result):
+    """Original box-by-box parser, kept here as the baseline"""
+    detections = {'people': [], 'weapons': [], 'objects': [], 'people_count': 0}
+    for box in result.boxes:
+        cls = int(box.cls[0])
+        conf = float(box.conf[0])
+        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().tolist()
+        if cls == 0:
+            detections['people'].append({'bbox': [x1, y1, x2, y2], 'confidence': conf})
+            detections['people_count'] += 1
+        elif cls in WEAPON_CLASSES:
+            detections['weapons'].append({'name': WEAPON_CLASSES[cls], 'confidence': conf,
+                                          'bbox': [x1, y1, x2, y2]})
+        else:
+            detections['objects'].append({'name': result.names[cls], 'confidence': conf,
+                                          'bbox': [x1, y1, x2, y2]})
+    return detections
+
+
+def make_result(num_boxes, device, rng):
+    """Build a synthetic YOLO result with num_boxes random detections"""
+    h, w = 1080, 1920
+    xy1 = rng.uniform(0, [w - 50, h - 50], size=(num_boxes, 2))
+    xy2 = xy1 + rng.uniform(10, 50, size=(num_boxes, 2))
+    conf = rng.uniform(0.25, 1.0, size=(num_boxes, 1))
+    # Mix of people, weapons and other COCO classes
+    cls = rng.choice([0, 0, 0, 43, 34, 76, 56, 41, 62], size=(num_boxes, 1))
+    data = torch.tensor(np.hstack([xy1, xy2, conf, cls]), dtype=torch.float32, device=device)
+    names = {i: f"class_{i}" for i in range(80)}
+    names[0] = 'person'
+    return Results(np.zeros((h, w, 3), dtype=np.uint8), path='', names=names, boxes=data)
+
+
+def time_parser(parser, result, repeats):
+    """Return mean milliseconds per call"""
+    parser(result)  # warmup
+    start = time.perf_counter()
+    for _ in range(repeats):
+        parser(result)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def run_benchmark(box_counts=(1, 5, 10, 25, 50, 100, 200, 300), repeats=200):
+    """Compare per-box and bulk parsing cost as boxes per frame grows"""
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    rng = np.random.default_rng(42)
+
+    print("=" * 60)
+    print(f"📊 parse_detections micro-benchmark (device: {device})")
+    print("=" * 60)
+    print(f"{'boxes':>6} {'per-box ms':>12} {'bulk ms':>10} {'speedup':>9}")
+
+    rows = []
+    for n in box_counts:
+        result = make_result(n, device, rng)
+        per_box = time_parser(parse_detections_per_box, result, repeats)
+        bulk = time_parser(parse_detections, result, repeats)
+        rows.append((n, per_box, bulk))
+        print(f"{n:>6} {per_box:>12.3f} {bulk:>10.3f} {per_box / bulk:>8.1f}x")
+
+    print("=" * 60)
+    return rows
+
+
+if __name__ == '__main__':
+    run_benchmark()
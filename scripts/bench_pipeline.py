@@ -0,0 +1,304 @@
+"""
+End-to-end pipeline benchmark: N synthetic (or recorded) cameras, M websocket clients.
+
+The real backend (capture threads, scheduler, YOLO, render, per-client queues)
+runs in a child process with every camera configured as a looping file
+source; this process plays the clients and measures what they actually
+receive. Latency is receive time minus the capture timestamp in each binary
+frame header, so it covers the whole pipeline including the send. CPU and
+RSS of the backend and all its worker processes are sampled with psutil, and
+the backend's own per-stage histograms are fetched with the 'metrics'
+command at the end.
+
+    python scripts/bench_pipeline.py --cameras 4 --clients 3 --duration 30
+    python scripts/bench_pipeline.py --video incident.mp4 --cameras 2 --output run.json
+
+Results are written as JSON (benchmarks/ by default) so runs can be compared.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+import psutil
+import websockets
+import yaml
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from camera_config import load_camera_config
+from protocol import unpack_frame
+
+SERVER_URL = "ws://localhost:8765"
+
+
+def make_synthetic_video(path, width=1280, height=720, fps=15, seconds=10, seed=0):
+    """Write a looping test clip: noisy background with a few moving blocks"""
+    rng = np.random.default_rng(seed)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    background = rng.integers(40, 90, (height, width, 3), dtype=np.uint8)
+    blocks = [(rng.integers(0, width), rng.integers(0, height), rng.integers(-12, 12), rng.integers(-8, 8),
+               tuple(int(c) for c in rng.integers(0, 255, 3))) for _ in range(5)]
+    for i in range(int(fps * seconds)):
+        frame = background.copy()
+        for x, y, dx, dy, color in blocks:
+            cx, cy = int((x + dx * i) % width), int((y + dy * i) % height)
+            cv2.rectangle(frame, (cx, cy), (cx + 120, cy + 240), color, -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def write_camera_config(path, args):
+    """cameras.yml for the run: the site's own settings with every camera playing the video"""
+    config = load_camera_config()
+    cameras = config.setdefault('cameras', {}) or {}
+    config['cameras'] = cameras
+    for camera_id in list(cameras):
+        if int(camera_id) >= args.cameras:
+            del cameras[camera_id]
+    for camera_id in range(args.cameras):
+        entry = cameras.setdefault(camera_id, {}) or {}
+        cameras[camera_id] = entry
+        entry['source'] = {'type': 'file', 'path': args.video, 'loop': True, 'realtime': True,
+                           'fps': args.fps}
+    with open(path, 'w') as f:
+        yaml.safe_dump(config, f)
+    return path
+
+
+async def wait_for_server(timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            async with websockets.connect(SERVER_URL):
+                return True
+        except OSError:
+            await asyncio.sleep(0.5)
+    return False
+
+
+async def run_client(index, args, stats, measuring, started):
+    """One simulated viewer: binary frames at the requested profile, latency per frame"""
+    async with websockets.connect(SERVER_URL, max_size=None) as ws:
+        await ws.send(json.dumps({'command': 'innit', 'binary_frames': True}))
+        await ws.send(json.dumps({
+            'command': 'subscribe',
+            'max_width': args.client_width,
+            'max_height': args.client_height,
+            'jpeg_quality': args.client_quality,
+        }))
+        if index == 0:
+            await ws.send(json.dumps({'command': 'start_cameras'}))
+        started.set()
+        async for message in ws:
+            if not isinstance(message, bytes):
+                continue
+            received = time.time()
+            if not measuring.is_set():
+                continue
+            frame = unpack_frame(message)
+            stats['frames'] += 1
+            stats['bytes'] += len(message)
+            stats['per_camera'][frame['camera_id']] = stats['per_camera'].get(frame['camera_id'], 0) + 1
+            stats['latencies'].append(received - frame['timestamp'])
+
+
+async def fetch_metrics():
+    async with websockets.connect(SERVER_URL, max_size=None) as ws:
+        await ws.send(json.dumps({'command': 'metrics'}))
+        async for message in ws:
+            if isinstance(message, str):
+                data = json.loads(message)
+                if data.get('type') == 'metrics':
+                    return data
+
+
+def sample_tree(server, tracked):
+    """Summed CPU % and RSS (MB) of the backend and its children (EXECUTION_MODE=process workers).
+
+    tracked keeps one psutil.Process per pid, since cpu_percent measures since the previous call
+    on the same object; a worker's first sample only primes it.
+    """
+    try:
+        processes = [server] + server.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return 0.0, 0.0, 0
+    cpu = rss = 0.0
+    for process in processes:
+        process = tracked.setdefault(process.pid, process)
+        try:
+            cpu += process.cpu_percent(None)
+            rss += process.memory_info().rss
+        except psutil.NoSuchProcess:
+            continue
+    return cpu, rss / 1e6, len(processes)
+
+
+def percentile_ms(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 1) if values else None
+
+
+async def benchmark(args, server):
+    if not await wait_for_server(args.startup_timeout):
+        raise RuntimeError("Backend did not start listening in time")
+
+    measuring = asyncio.Event()
+    client_stats = [{'frames': 0, 'bytes': 0, 'per_camera': {}, 'latencies': []} for _ in range(args.clients)]
+    started = [asyncio.Event() for _ in range(args.clients)]
+    tasks = [asyncio.create_task(run_client(i, args, client_stats[i], measuring, started[i]))
+             for i in range(args.clients)]
+    await asyncio.gather(*(e.wait() for e in started))
+
+    # Warm up (model, encoders, first batches) before measuring
+    await asyncio.sleep(args.warmup)
+    tracked = {}
+    sample_tree(psutil.Process(server.pid), tracked)
+    cpu_samples, rss_samples, process_counts = [], [], []
+    measuring.set()
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.duration:
+        await asyncio.sleep(0.5)
+        cpu, rss, count = sample_tree(psutil.Process(server.pid), tracked)
+        cpu_samples.append(cpu)
+        rss_samples.append(rss)
+        process_counts.append(count)
+    measuring.clear()
+    elapsed = time.perf_counter() - start
+
+    metrics = await fetch_metrics()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies = [lat for s in client_stats for lat in s['latencies']]
+    frames = sum(s['frames'] for s in client_stats)
+    stages = {}
+    for series in metrics['metrics'].get('pipeline_stage_seconds', []):
+        stage = series['labels']['stage']
+        camera = series['labels']['camera']
+        stages.setdefault(stage, {})[str(camera)] = {
+            'count': series['count'], 'p50_ms': series['p50_ms'], 'p99_ms': series['p99_ms']
+        }
+    counters = {name: sum(s['value'] for s in metrics['metrics'].get(name, []))
+                for name in ('frames_processed_total', 'frames_inferred_total',
+                             'capture_frames_dropped_total', 'client_frames_dropped_total')}
+
+    return {
+        'seconds': round(elapsed, 2),
+        'delivered_fps_per_client': round(frames / elapsed / args.clients, 2),
+        'delivered_fps_per_camera': round(frames / elapsed / args.clients / args.cameras, 2),
+        'delivered_mbps_per_client': round(sum(s['bytes'] for s in client_stats) * 8 / 1e6 / elapsed / args.clients, 2),
+        'latency_ms': {
+            'p50': percentile_ms(latencies, 50),
+            'p95': percentile_ms(latencies, 95),
+            'p99': percentile_ms(latencies, 99),
+            'max': percentile_ms(latencies, 100),
+        },
+        'cpu_percent': {
+            'mean': round(float(np.mean(cpu_samples)), 1) if cpu_samples else None,
+            'max': round(float(np.max(cpu_samples)), 1) if cpu_samples else None,
+            'cores': psutil.cpu_count(),
+            'processes': max(process_counts) if process_counts else None,
+        },
+        'rss_mb': {
+            'mean': round(float(np.mean(rss_samples)), 1) if rss_samples else None,
+            'max': round(float(np.max(rss_samples)), 1) if rss_samples else None,
+        },
+        'counters': counters,
+        'scheduler': metrics.get('scheduler'),
+        'stages': stages,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(args):
+    tmpdir = tempfile.TemporaryDirectory()
+    synthetic = args.video is None
+    if synthetic:
+        args.video = str(make_synthetic_video(Path(tmpdir.name) / 'synthetic.avi',
+                                              args.width, args.height, args.fps or 15))
+        print(f"🎞️ Synthetic {args.width}x{args.height} video: {args.video}")
+    else:
+        args.video = str(Path(args.video).resolve())
+
+    # Every camera reads the video through the normal file source (sources.py)
+    env = dict(os.environ, CAMERA_CONFIG=str(write_camera_config(Path(tmpdir.name) / 'cameras.yml', args)))
+    server = subprocess.Popen([sys.executable, str(ROOT / 'backend.py')], cwd=ROOT, env=env)
+    try:
+        results = asyncio.run(benchmark(args, server))
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        tmpdir.cleanup()
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'host': {'platform': platform.platform(), 'python': platform.python_version(),
+                 'cpu_count': psutil.cpu_count()},
+        'config': {
+            'cameras': args.cameras,
+            'clients': args.clients,
+            'video': f"synthetic {args.width}x{args.height}" if synthetic else args.video,
+            'source_fps': args.fps,
+            'client_profile': [args.client_width, args.client_height, args.client_quality],
+            'warmup': args.warmup,
+            'duration': args.duration,
+            'execution_mode': os.environ.get('EXECUTION_MODE', 'thread'),
+            'runtime': os.environ.get('INFERENCE_RUNTIME', 'pytorch'),
+        },
+        'results': results,
+    }
+
+    output = Path(args.output) if args.output else ROOT / 'benchmarks' / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    r = results
+    print("=" * 60)
+    print(f"{args.cameras} camera(s), {args.clients} client(s), {r['seconds']}s")
+    print(f"Delivered: {r['delivered_fps_per_camera']} fps per camera per client")
+    print(f"Latency:   p50 {r['latency_ms']['p50']} ms, p99 {r['latency_ms']['p99']} ms")
+    print(f"CPU:       {r['cpu_percent']['mean']}% mean, {r['cpu_percent']['max']}% max")
+    print(f"RSS:       {r['rss_mb']['max']} MB max")
+    print(f"💾 Report saved to {output}")
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the full backend pipeline end to end")
+    parser.add_argument('--cameras', type=int, default=2, help="Cameras, all reading the same video")
+    parser.add_argument('--clients', type=int, default=2, help="Simulated websocket clients")
+    parser.add_argument('--video', help="Recorded video to play (default: generate a synthetic one)")
+    parser.add_argument('--width', type=int, default=1280, help="Synthetic video width")
+    parser.add_argument('--height', type=int, default=720, help="Synthetic video height")
+    parser.add_argument('--fps', type=float, help="Source frame rate (default: the video's own)")
+    parser.add_argument('--client-width', type=int, default=640)
+    parser.add_argument('--client-height', type=int, default=480)
+    parser.add_argument('--client-quality', type=int, default=75)
+    parser.add_argument('--warmup', type=float, default=5.0, help="Seconds before measuring")
+    parser.add_argument('--duration', type=float, default=20.0, help="Seconds to measure")
+    parser.add_argument('--startup-timeout', type=float, default=120.0)
+    parser.add_argument('--output', help="JSON report path (default: benchmarks/bench_<stamp>.json)")
+    args = parser.parse_args()
+    main(args)
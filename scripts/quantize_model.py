@@ -0,0 +1,87 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from runtimes import DATA_YAML, calibration_images, ensure_export, load_model
+from validate_model import validate_model
+
+
+def measure_latency(model, frames, warmup=3):
+    """Mean and p95 milliseconds per frame for single-frame inference"""
+    for frame in frames[:warmup]:
+        model(frame, verbose=False)
+    timings = []
+    for frame in frames:
+        start = time.perf_counter()
+        model(frame, verbose=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.mean(timings)), float(np.percentile(timings, 95))
+
+
+def load_frames(limit):
+    """Frames from the calibration set, or synthetic noise if the dataset isn't present"""
+    frames = [cv2.imread(str(p)) for p in calibration_images(limit=limit)]
+    frames = [f for f in frames if f is not None]
+    if not frames:
+        print("⚠️ No images in data/images/val, timing on synthetic 1080p frames")
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 255, (1080, 1920, 3), dtype=np.uint8) for _ in range(limit)]
+    return frames
+
+
+def quantization_report(weights_path, runtime='onnx', data=str(DATA_YAML), frames=50, skip_val=False):
+    """Build the FP32 and INT8 variants of a model and compare mAP and ms/frame side by side"""
+    weights_path = Path(weights_path).resolve()
+    fp32_runtime, int8_runtime = runtime, f"{runtime}-int8"
+
+    print("=" * 60)
+    print(f"🧮 INT8 quantization report: {weights_path.name} ({runtime})")
+    print("=" * 60)
+
+    test_frames = load_frames(frames)
+    rows = {}
+    for label, rt in (("FP32", fp32_runtime), ("INT8", int8_runtime)):
+        model_file = ensure_export(weights_path, rt)
+        model = load_model(weights_path, rt, 'cpu')
+        mean_ms, p95_ms = measure_latency(model, test_frames)
+        row = {'runtime': rt, 'model_file': str(model_file), 'ms_per_frame': mean_ms, 'p95_ms': p95_ms}
+        if not skip_val:
+            metrics = validate_model(model_file, data=data)
+            row.update({'map50': float(metrics.box.map50), 'map50_95': float(metrics.box.map),
+                        'precision': float(metrics.box.mp), 'recall': float(metrics.box.mr)})
+        rows[label] = row
+
+    print("\n" + "=" * 60)
+    print(f"{'':12} {'FP32':>12} {'INT8':>12} {'change':>10}")
+    for key, fmt in (('ms_per_frame', '.2f'), ('p95_ms', '.2f'), ('map50', '.4f'), ('map50_95', '.4f')):
+        if key not in rows['FP32']:
+            continue
+        fp32, int8 = rows['FP32'][key], rows['INT8'][key]
+        change = f"{(int8 - fp32) / fp32 * 100:+.1f}%" if fp32 else "n/a"
+        print(f"{key:12} {fp32:>12{fmt}} {int8:>12{fmt}} {change:>10}")
+    print("=" * 60)
+
+    report_path = weights_path.parent / f"{weights_path.stem}_{runtime}_int8_report.json"
+    with open(report_path, 'w') as f:
+        json.dump({'weights': str(weights_path), 'frames': len(test_frames), **rows}, f, indent=2)
+    print(f"💾 Saved report to: {report_path}")
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare a model's INT8 variant against FP32")
+    parser.add_argument('weights', help="Path to the .pt model (anything scan_yolo_models finds)")
+    parser.add_argument('--runtime', choices=['onnx', 'openvino'], default='onnx')
+    parser.add_argument('--data', default=str(DATA_YAML), help="Dataset yaml used for mAP")
+    parser.add_argument('--frames', type=int, default=50, help="Frames used for timing")
+    parser.add_argument('--skip-val', action='store_true', help="Only measure latency")
+    args = parser.parse_args()
+
+    quantization_report(args.weights, args.runtime, args.data, args.frames, args.skip_val)
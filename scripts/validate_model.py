@@ -1,14 +1,14 @@
 from ultralytics import YOLO
 
-def validate_model(model_path='runs/detect/security_detector/weights/best.pt'):
+def validate_model(model_path='runs/detect/security_detector/weights/best.pt', data='data/data.yaml'):
     """Validate the trained model"""
     
-    # Load best trained model
-    model = YOLO(model_path)
+    # Load best trained model (exported ONNX/OpenVINO models need the task spelled out)
+    model = YOLO(str(model_path), task='detect')
     
     # Validate
     print("🔍 Validating model...")
-    metrics = model.val(data='data/data.yaml')
+    metrics = model.val(data=data)
     
     print("\n" + "="*60)
     print("📊 Validation Results")
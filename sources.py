@@ -0,0 +1,253 @@
+"""
+Frame sources for CaptureWorker.
+
+A camera can read from a local device, a video file, a directory of images
+or a network stream (RTSP/HTTP/...). Sources are configured per camera in
+cameras.yml under 'source', either as a shorthand or a mapping:
+
+    source: 0                              # device index
+    source: incidents/lobby.mp4            # video file
+    source: rtsp://10.0.0.5/stream1        # network stream
+    source:
+      type: file                           # device | file | images | url
+      path: incidents/lobby.mp4
+      loop: true                           # start over at the end
+      realtime: false                      # every frame, as fast as the pipeline takes them
+
+Every source has the same small interface: open(), read() -> (ok, frame),
+release() and describe(). read() blocks at the source's natural pace: the
+device or stream delivers at its own rate, files and image directories are
+paced to their frame rate when realtime is on. Sources with lockstep=True
+want every frame processed, so CaptureWorker waits for the pipeline to take
+each frame before reading the next.
+"""
+
+import logging
+import threading
+import time
+from pathlib import Path
+
+import cv2
+
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+class FrameSource:
+    lockstep = False   # True: hand over every frame instead of the latest one
+    finished = False   # True once a non-looping source has run out of frames
+
+    def open(self):
+        raise NotImplementedError
+
+    def read(self):
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+    def describe(self):
+        raise NotImplementedError
+
+
+class DeviceSource(FrameSource):
+    """Local capture device by index"""
+
+    def __init__(self, index):
+        self.index = int(index)
+        self.cap = None
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.index)
+        if not self.cap.isOpened():
+            return False
+        # Ask the driver not to queue frames; we always want the newest one
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        # Re-read values to verify
+        actual_brightness = self.cap.get(cv2.CAP_PROP_BRIGHTNESS)
+        actual_fps = self.cap.get(cv2.CAP_PROP_FPS)
+        print(f"Brightness set to {actual_brightness}, FPS set to {actual_fps}")
+        return True
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+    def describe(self):
+        return {'type': 'device', 'device': self.index}
+
+
+class _PacedSource(FrameSource):
+    """Shared pacing for files and image directories"""
+
+    def __init__(self, loop=True, realtime=True, fps=None):
+        self.loop = loop
+        self.realtime = realtime
+        self.lockstep = not realtime
+        self.fps = fps
+        self._next_at = None
+
+    def _pace(self):
+        if not self.realtime:
+            return
+        interval = 1.0 / (self.fps or 15.0)
+        now = time.perf_counter()
+        if self._next_at is None or now - self._next_at > 1.0:
+            # First frame, or we fell far behind: don't try to catch up in a burst
+            self._next_at = now
+        else:
+            self._next_at += interval
+            if self._next_at > now:
+                time.sleep(self._next_at - now)
+
+
+class VideoFileSource(_PacedSource):
+    """Recorded video, optionally looped, at its own frame rate or as fast as frames are taken"""
+
+    def __init__(self, path, loop=True, realtime=True, fps=None):
+        super().__init__(loop, realtime, fps)
+        self.path = str(path)
+        self.cap = None
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            return False
+        self.fps = self.fps or self.cap.get(cv2.CAP_PROP_FPS) or 15.0
+        return True
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            if not self.loop:
+                self.finished = True
+                return False, None
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+            if not ret:
+                return False, None
+        self._pace()
+        return True, frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+    def describe(self):
+        return {'type': 'file', 'path': self.path, 'loop': self.loop, 'realtime': self.realtime,
+                'fps': self.fps}
+
+
+class ImageDirSource(_PacedSource):
+    """Sorted image files in a directory played as a sequence"""
+
+    def __init__(self, path, loop=True, realtime=True, fps=5.0):
+        super().__init__(loop, realtime, fps)
+        self.path = Path(path)
+        self.files = []
+        self._index = 0
+
+    def open(self):
+        if not self.path.is_dir():
+            return False
+        self.files = sorted(p for p in self.path.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+        # Only decodes up to the first good image; a directory of nothing but broken files fails here
+        return any(cv2.imread(str(p)) is not None for p in self.files)
+
+    def read(self):
+        # At most one full pass: if nothing in it decodes, fail this read instead of spinning
+        for _ in range(len(self.files)):
+            if self._index >= len(self.files):
+                if not self.loop:
+                    self.finished = True
+                    return False, None
+                self._index = 0
+            path = self.files[self._index]
+            self._index += 1
+            frame = cv2.imread(str(path))
+            if frame is not None:
+                self._pace()
+                return True, frame
+            logging.warning(f"Skipping unreadable image {path}")
+        return False, None
+
+    def describe(self):
+        return {'type': 'images', 'path': str(self.path), 'frames': len(self.files), 'loop': self.loop,
+                'realtime': self.realtime, 'fps': self.fps}
+
+
+class StreamSource(FrameSource):
+    """Network stream (RTSP, HTTP MJPEG, ...) that reconnects when it drops"""
+
+    def __init__(self, url, reconnect_seconds=2.0):
+        self.url = url
+        self.reconnect_seconds = reconnect_seconds
+        self.cap = None
+        self.reconnects = 0
+        self._released = threading.Event()
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.url, cv2.CAP_FFMPEG)
+        if not self.cap.isOpened():
+            return False
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return True
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if ret:
+            return True, frame
+        logging.warning(f"Stream {self.url} dropped, reconnecting in {self.reconnect_seconds}s")
+        self.cap.release()
+        # Wakes early on release(), so a stopping worker never reopens a capture nobody will release
+        if self._released.wait(self.reconnect_seconds):
+            return False, None
+        self.reconnects += 1
+        self.open()
+        if self._released.is_set():
+            # release() ran while we were reconnecting
+            self.cap.release()
+        return False, None
+
+    def release(self):
+        self._released.set()
+        if self.cap is not None:
+            self.cap.release()
+
+    def describe(self):
+        return {'type': 'url', 'url': self.url, 'reconnects': self.reconnects}
+
+
+def make_source(spec, camera_id=0):
+    """Build a FrameSource from a cameras.yml 'source' value (None means device camera_id)"""
+    if spec is None:
+        return DeviceSource(camera_id)
+    if isinstance(spec, int):
+        return DeviceSource(spec)
+    if isinstance(spec, str):
+        if '://' in spec:
+            return StreamSource(spec)
+        if spec.isdigit():
+            return DeviceSource(int(spec))
+        if Path(spec).is_dir():
+            return ImageDirSource(spec)
+        return VideoFileSource(spec)
+
+    spec = dict(spec)
+    kind = spec.pop('type', None)
+    if kind is None:
+        kind = ('url' if 'url' in spec else 'device' if 'device' in spec
+                else 'images' if Path(spec.get('path', '')).is_dir() else 'file')
+    if kind == 'device':
+        return DeviceSource(spec.get('device', camera_id))
+    if kind == 'file':
+        return VideoFileSource(spec['path'], spec.get('loop', True), spec.get('realtime', True), spec.get('fps'))
+    if kind == 'images':
+        return ImageDirSource(spec['path'], spec.get('loop', True), spec.get('realtime', True), spec.get('fps', 5.0))
+    if kind == 'url':
+        return StreamSource(spec['url'], spec.get('reconnect_seconds', 2.0))
+    raise ValueError(f"Unknown source type '{kind}' for camera {camera_id}, "
+                     "expected device, file, images or url")
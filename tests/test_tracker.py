@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tracker import BoxTracker
+
+
+def person(bbox):
+    return {'name': 'person', 'confidence': 0.9, 'bbox': list(bbox)}
+
+
+def frame(people):
+    return {'people': people, 'weapons': [], 'objects': [], 'people_count': len(people)}
+
+
+def test_static_person_keeps_track_between_sparse_inferences():
+    # Motion gating on a static scene runs YOLO only every max_skip_seconds (2 s by default)
+    tracker = BoxTracker()
+    box = (100, 100, 200, 400)
+    counts, track_ids = [], set()
+    t = 0.0
+    for _ in range(5):
+        detections = tracker.update(frame([person(box)]), t)
+        counts.append(detections['people_count'])
+        track_ids.add(detections['people'][0]['track_id'])
+        for _ in range(19):
+            t += 0.1
+            predicted = tracker.predict(frame([]), t)
+            assert predicted['people_count'] == counts[-1]
+            assert len(predicted['people']) == 1
+        t += 0.1
+
+    assert counts == [0, 1, 1, 1, 1]
+    assert len(track_ids) == 1
+    assert tracker.unique_people == 1
+
+
+def test_track_dropped_after_max_misses_inferences():
+    tracker = BoxTracker(max_misses=2)
+    tracker.update(frame([person((0, 0, 50, 100))]), 0.0)
+    tracker.update(frame([person((0, 0, 50, 100))]), 1.0)
+    for i in range(2):
+        assert tracker.update(frame([]), 2.0 + i)['people_count'] == 1
+    assert tracker.update(frame([]), 4.0)['people_count'] == 0
+    assert tracker.tracks == []
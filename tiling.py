@@ -0,0 +1,154 @@
+"""
+Tiled inference for small objects in high-resolution frames.
+
+YOLO shrinks a 1080p or 4K frame to 640 px, which leaves a knife only a few
+pixels wide. In tiled mode the frame is also cut into overlapping crops
+that each go through the model at (close to) native resolution, all tiles
+of a frame in one batch, and the boxes are merged with class-aware NMS.
+
+Two modes:
+    grid    overlapping tile_size tiles over the whole frame, at most max_tiles
+            (tiles grow if the grid would need more)
+    people  one crop around each person found by the normal full-frame pass,
+            so weapons are looked for where they matter and cost stays bounded
+"""
+
+import math
+
+import numpy as np
+
+
+def grid_tiles(shape, tile_size=640, overlap=0.2, max_tiles=16):
+    """Overlapping (x1, y1, x2, y2) tiles covering the frame, the last row/column flush with the edge"""
+    h, w = shape[:2]
+    size = tile_size
+    while True:
+        step = max(1, int(size * (1.0 - overlap)))
+        cols = 1 if w <= size else math.ceil((w - size) / step) + 1
+        rows = 1 if h <= size else math.ceil((h - size) / step) + 1
+        if cols * rows <= max_tiles:
+            break
+        size = int(size * 1.25)
+    xs = [min(i * step, max(0, w - size)) for i in range(cols)]
+    ys = [min(j * step, max(0, h - size)) for j in range(rows)]
+    return [(x, y, min(w, x + size), min(h, y + size)) for y in ys for x in xs]
+
+
+def person_tiles(people, shape, margin=0.25, max_tiles=16, min_size=160):
+    """One crop per person box, grown by margin on each side, largest people first"""
+    h, w = shape[:2]
+    boxes = sorted((p['bbox'] for p in people), key=lambda b: (b[2] - b[0]) * (b[3] - b[1]), reverse=True)
+    tiles = []
+    for x1, y1, x2, y2 in boxes[:max_tiles]:
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        half_w = max(min_size, (x2 - x1) * (1 + 2 * margin)) / 2
+        half_h = max(min_size, (y2 - y1) * (1 + 2 * margin)) / 2
+        tiles.append((int(max(0, cx - half_w)), int(max(0, cy - half_h)),
+                      int(min(w, cx + half_w)), int(min(h, cy + half_h))))
+    return tiles
+
+
+def nms(boxes, scores, iou_threshold):
+    """Indices of the boxes kept by greedy non-maximum suppression"""
+    boxes = np.asarray(boxes, dtype=np.float32)
+    order = np.argsort(scores)[::-1]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(int(i))
+        rest = order[1:]
+        xx1 = np.maximum(boxes[i, 0], boxes[rest, 0])
+        yy1 = np.maximum(boxes[i, 1], boxes[rest, 1])
+        xx2 = np.minimum(boxes[i, 2], boxes[rest, 2])
+        yy2 = np.minimum(boxes[i, 3], boxes[rest, 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return keep
+
+
+def merge_detections(parts, iou_threshold=0.5):
+    """Combine detections dicts already in frame coordinates, suppressing duplicates per class"""
+    merged = {'people': [], 'weapons': [], 'objects': [], 'people_count': 0, 'threat_level': 0, 'alert': None}
+    for key in ('people', 'weapons', 'objects'):
+        candidates = [d for part in parts for d in part[key]]
+        by_class = {}
+        for detection in candidates:
+            by_class.setdefault(detection.get('name', key), []).append(detection)
+        for group in by_class.values():
+            keep = nms([d['bbox'] for d in group], np.array([d['confidence'] for d in group]), iou_threshold)
+            merged[key].extend(group[i] for i in keep)
+    merged['people_count'] = len(merged['people'])
+    return merged
+
+
+def shift_detections(detections, ox, oy):
+    """Move a crop's boxes into frame coordinates (in place)"""
+    for key in ('people', 'weapons', 'objects'):
+        for detection in detections[key]:
+            x1, y1, x2, y2 = detection['bbox']
+            detection['bbox'] = [x1 + ox, y1 + oy, x2 + ox, y2 + oy]
+    return detections
+
+
+class TiledDetector:
+    def __init__(self, mode='grid', tile_size=640, overlap=0.2, max_tiles=16, include_full_frame=True,
+                 person_margin=0.25, nms_iou=0.5, **_):
+        """
+        Args:
+            mode (str): 'grid' (tile the whole frame) or 'people' (crop around each person)
+            tile_size (int): Grid tile edge in pixels
+            overlap (float): Fraction of a tile shared with its neighbour, so objects on a seam
+                are whole in at least one tile
+            max_tiles (int): Most crops per frame in either mode
+            include_full_frame (bool): Grid mode also runs the whole frame; people and objects
+                then come from it alone and tiles only add weapons (people mode always does)
+            person_margin (float): Extra context around each person box, per side
+            nms_iou (float): IoU above which boxes of the same class from different tiles are merged
+        """
+        if mode not in ('grid', 'people'):
+            raise ValueError(f"Unknown tiling mode '{mode}', expected grid or people")
+        self.mode = mode
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.max_tiles = max_tiles
+        self.include_full_frame = include_full_frame
+        self.person_margin = person_margin
+        self.nms_iou = nms_iou
+        self.last_tiles = 0
+
+    async def detect(self, frame, detect_full, detect_batch):
+        """Tiled detections for one frame.
+
+        Args:
+            detect_full: async frame -> detections (or None if superseded), the normal path
+            detect_batch: async list of frames -> list of detections, run as one batch
+
+        Returns:
+            dict: Merged detections, or None if the full-frame pass was superseded
+        """
+        parts = []
+        if self.mode == 'people' or self.include_full_frame:
+            full = await detect_full(frame)
+            if full is None:
+                return None
+            parts.append(full)
+
+        if self.mode == 'grid':
+            tiles = grid_tiles(frame.shape, self.tile_size, self.overlap, self.max_tiles)
+        else:
+            tiles = person_tiles(parts[0]['people'], frame.shape, self.person_margin, self.max_tiles)
+        self.last_tiles = len(tiles)
+        if tiles:
+            crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+            results = await detect_batch(crops)
+            # With a full-frame pass, tiles are only there to find small weapons: a person
+            # or large object cut at a seam gives partial boxes that NMS can't merge back
+            weapons_only = self.mode == 'people' or self.include_full_frame
+            for (x1, y1, _, _), detections in zip(tiles, results):
+                if weapons_only:
+                    detections['people'] = []
+                    detections['objects'] = []
+                parts.append(shift_detections(detections, x1, y1))
+        return merge_detections(parts, self.nms_iou)
@@ -0,0 +1,154 @@
+"""
+Lightweight multi-object tracker for carrying boxes between inference frames.
+
+Detections are matched to existing tracks greedily by IoU (same category and
+name only). Each track keeps a constant-velocity estimate smoothed with an
+alpha-beta filter, a simplified Kalman update, so boxes can be predicted
+forward on frames where YOLO is skipped. Every detection gets a persistent
+track_id, and people_count becomes the number of live person tracks instead
+of a raw per-frame count.
+
+Tracks age in inference frames, not seconds: a track is dropped after
+max_misses inference results in a row without a match. Motion gating can
+skip YOLO for seconds on a static scene, and a person standing still there
+must keep their track (and count) until an inference actually misses them.
+"""
+
+import itertools
+
+import numpy as np
+
+CATEGORIES = ('people', 'weapons', 'objects')
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between two (N, 4) and (M, 4) arrays of x1, y1, x2, y2 boxes"""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+class Track:
+    def __init__(self, track_id, category, detection, timestamp):
+        self.track_id = track_id
+        self.category = category
+        self.detection = detection
+        self.bbox = np.array(detection['bbox'], dtype=np.float32)
+        self.velocity = np.zeros(4, dtype=np.float32)  # px/s for each of x1, y1, x2, y2
+        self.last_update = timestamp
+        self.hits = 1
+        self.misses = 0  # inference frames in a row without a match
+
+    @property
+    def name(self):
+        return self.detection.get('name')
+
+    def predict(self, timestamp):
+        """Box position extrapolated to timestamp"""
+        return self.bbox + self.velocity * max(0.0, timestamp - self.last_update)
+
+    def update(self, detection, timestamp, alpha, beta):
+        """Alpha-beta filter step towards the newly measured box"""
+        dt = max(1e-3, timestamp - self.last_update)
+        predicted = self.predict(timestamp)
+        residual = np.array(detection['bbox'], dtype=np.float32) - predicted
+        self.bbox = predicted + alpha * residual
+        self.velocity = self.velocity + (beta / dt) * residual
+        self.detection = detection
+        self.last_update = timestamp
+        self.hits += 1
+        self.misses = 0
+
+
+class BoxTracker:
+    def __init__(self, iou_threshold=0.3, max_misses=2, min_hits=2, alpha=0.85, beta=0.3, **_):
+        """
+        Args:
+            iou_threshold (float): Minimum IoU to match a detection to a track
+            max_misses (int): Inference frames in a row a track survives without a matching detection
+            min_hits (int): Matches needed before a track counts towards people_count
+            alpha (float): Position gain of the alpha-beta filter
+            beta (float): Velocity gain of the alpha-beta filter
+        """
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.alpha = alpha
+        self.beta = beta
+        self.tracks = []
+        self._ids = itertools.count(1)
+        self.unique_people = 0
+
+    def _match(self, tracks, new_detections, timestamp):
+        """Greedy IoU matching. Returns (pairs, unmatched detection indexes)."""
+        if not tracks or not new_detections:
+            return [], list(range(len(new_detections)))
+        predicted = [t.predict(timestamp) for t in tracks]
+        ious = iou_matrix(predicted, [d['bbox'] for d in new_detections])
+        # Only match within the same label (e.g. a knife track never takes a bat)
+        for ti, track in enumerate(tracks):
+            for di, det in enumerate(new_detections):
+                if track.name != det.get('name'):
+                    ious[ti, di] = 0.0
+
+        pairs = []
+        used_tracks, used_dets = set(), set()
+        for flat in np.argsort(-ious, axis=None):
+            ti, di = np.unravel_index(flat, ious.shape)
+            if ious[ti, di] < self.iou_threshold:
+                break
+            if ti in used_tracks or di in used_dets:
+                continue
+            pairs.append((tracks[ti], new_detections[di]))
+            used_tracks.add(ti)
+            used_dets.add(di)
+        unmatched = [i for i in range(len(new_detections)) if i not in used_dets]
+        return pairs, unmatched
+
+    def update(self, detections, timestamp):
+        """Match a fresh inference result to tracks and tag each detection with a track_id"""
+        for category in CATEGORIES:
+            category_tracks = [t for t in self.tracks if t.category == category]
+            new_detections = detections.get(category, [])
+            pairs, unmatched = self._match(category_tracks, new_detections, timestamp)
+            matched = {id(track) for track, _ in pairs}
+            for track in category_tracks:
+                if id(track) not in matched:
+                    track.misses += 1
+            for track, det in pairs:
+                track.update(det, timestamp, self.alpha, self.beta)
+                det['track_id'] = track.track_id
+            for i in unmatched:
+                track = Track(next(self._ids), category, new_detections[i], timestamp)
+                new_detections[i]['track_id'] = track.track_id
+                self.tracks.append(track)
+                if category == 'people':
+                    self.unique_people += 1
+
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+        return self._finish(detections)
+
+    def predict(self, detections, timestamp):
+        """Fill detections with track boxes extrapolated to timestamp (no inference this frame)"""
+        for category in CATEGORIES:
+            detections[category] = [
+                dict(t.detection, bbox=t.predict(timestamp).tolist(), predicted=True)
+                for t in self.tracks if t.category == category
+            ]
+        return self._finish(detections)
+
+    def _finish(self, detections):
+        """Replace the per-frame people count with the number of confirmed live person tracks"""
+        detections['people_count'] = sum(
+            1 for t in self.tracks if t.category == 'people' and t.hits >= self.min_hits
+        )
+        detections['unique_people'] = self.unique_people
+        return detections
@@ -0,0 +1,91 @@
+"""
+Per-camera regions of interest.
+
+Zones are polygons or rectangles in normalized (0-1) coordinates. When a
+camera has zones, inference runs only on the bounding crop of all of them
+(plus a little padding so people at the edge keep their context), boxes are
+mapped back to full-frame coordinates, and any detection whose anchor point
+is outside every zone is dropped before tracking and threat logic.
+
+    zones:
+      areas:
+        - [[0.6, 0.0], [1.0, 0.0], [1.0, 0.7], [0.6, 0.7]]   # polygon
+        - {rect: [0.0, 0.5, 0.2, 1.0], name: side door}      # rectangle x1, y1, x2, y2
+"""
+
+import cv2
+import numpy as np
+
+
+def _zone_points(zone):
+    """Normalized polygon points for a zone given as a point list, {polygon: ...} or {rect: ...}"""
+    if isinstance(zone, dict):
+        if 'rect' in zone:
+            x1, y1, x2, y2 = zone['rect']
+            return [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+        return zone['polygon']
+    return zone
+
+
+class ZoneFilter:
+    def __init__(self, areas, padding=0.05, anchor='center', **_):
+        """
+        Args:
+            areas (list): Polygons ([[x, y], ...]) or {rect: [x1, y1, x2, y2]} dicts, normalized
+            padding (float): Extra margin around the zones' bounding box, as a fraction of the frame
+            anchor (str): Point of a box that must be inside a zone: 'center' or 'bottom' (feet)
+        """
+        self.polygons = [np.array(_zone_points(zone), dtype=np.float32) for zone in areas]
+        self.padding = padding
+        self.anchor = anchor
+        self._shape = None
+        self._pixel_polygons = []
+        self._crop = None
+
+        # Stats
+        self.detections_dropped = 0
+
+    def _prepare(self, shape):
+        """Convert zones to pixels and work out the crop for this frame size"""
+        h, w = shape[:2]
+        scale = np.array([w, h], dtype=np.float32)
+        self._pixel_polygons = [(polygon * scale).reshape(-1, 1, 2) for polygon in self.polygons]
+        points = np.concatenate(self.polygons)
+        x1, y1 = points.min(axis=0) - self.padding
+        x2, y2 = points.max(axis=0) + self.padding
+        self._crop = (
+            int(max(0.0, x1) * w), int(max(0.0, y1) * h),
+            int(np.ceil(min(1.0, x2) * w)), int(np.ceil(min(1.0, y2) * h)),
+        )
+        self._shape = shape[:2]
+
+    def crop(self, frame):
+        """The part of the frame to run inference on (a view, no copy) and its (x, y) offset"""
+        if self._shape != frame.shape[:2]:
+            self._prepare(frame.shape)
+        x1, y1, x2, y2 = self._crop
+        return frame[y1:y2, x1:x2], (x1, y1)
+
+    def _inside(self, bbox):
+        x1, y1, x2, y2 = bbox
+        point = ((x1 + x2) / 2, y2 if self.anchor == 'bottom' else (y1 + y2) / 2)
+        return any(cv2.pointPolygonTest(polygon, point, False) >= 0 for polygon in self._pixel_polygons)
+
+    def restore(self, detections, offset):
+        """Shift crop detections back to frame coordinates and drop those outside every zone"""
+        ox, oy = offset
+        for key in ('people', 'weapons', 'objects'):
+            kept = []
+            for detection in detections[key]:
+                x1, y1, x2, y2 = detection['bbox']
+                detection['bbox'] = [x1 + ox, y1 + oy, x2 + ox, y2 + oy]
+                if self._inside(detection['bbox']):
+                    kept.append(detection)
+            self.detections_dropped += len(detections[key]) - len(kept)
+            detections[key] = kept
+        detections['people_count'] = len(detections['people'])
+        return detections
+
+    def crop_box(self):
+        """Current crop in pixels (x1, y1, x2, y2), or None before the first frame"""
+        return self._crop